@@ -0,0 +1,94 @@
+# vim: set fileencoding=utf-8 :
+"""
+Compare the compiled serializer with dictalchemy asdict
+
+Serializes a page of 1000 rows with `asdict(**params)` on every row and with
+:class:`flask_alchemyview._AsdictSerializer`. Run from the repository root::
+
+    python benchmarks/serializer.py
+
+"""
+from __future__ import absolute_import, division, print_function
+
+import sys
+import os
+import timeit
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_alchemyview import _AsdictSerializer
+
+from sqlalchemy import (
+    create_engine,
+    Column,
+    Integer,
+    Unicode,
+    DateTime,
+    ForeignKey,
+)
+from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.ext.declarative import declarative_base
+from dictalchemy import DictableModel
+
+ROWS = 1000
+REPEAT = 5
+NUMBER = 10
+
+Base = declarative_base(cls=DictableModel)
+
+
+class Group(Base):
+
+    __tablename__ = 'group'
+
+    id = Column(Integer, primary_key=True)
+
+    name = Column(Unicode)
+
+
+class User(Base):
+
+    __tablename__ = 'user'
+
+    id = Column(Integer, primary_key=True)
+
+    name = Column(Unicode)
+
+    email = Column(Unicode)
+
+    created = Column(DateTime)
+
+    group_id = Column(Integer, ForeignKey('group.id'))
+
+    group = relationship(Group)
+
+
+def main():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    group = Group(name=u'group')
+    session.add_all([User(name=u'user %d' % i,
+                          email=u'user%d@example.com' % i,
+                          created=datetime.datetime.now(),
+                          group=group)
+                     for i in range(ROWS)])
+    session.flush()
+    users = session.query(User).all()
+
+    for params in ({}, {'follow': {'group': {'only': ['name']}}}):
+        serializer = _AsdictSerializer(params)
+        assert [serializer(u) for u in users] == \
+            [u.asdict(**params) for u in users]
+        asdict = min(timeit.repeat(lambda: [u.asdict(**params)
+                                            for u in users],
+                                   repeat=REPEAT, number=NUMBER)) / NUMBER
+        compiled = min(timeit.repeat(lambda: [serializer(u) for u in users],
+                                     repeat=REPEAT, number=NUMBER)) / NUMBER
+        print('%-45r asdict: %7.2fms  compiled: %7.2fms  (%.1fx)' %
+              (params, asdict * 1000, compiled * 1000, asdict / compiled))
+
+
+if __name__ == '__main__':
+    main()
@@ -16,22 +16,56 @@ from __future__ import absolute_import, division
 import re
 import os
 import json
+import base64
+import copy
+import operator
+import collections
 import datetime
 import decimal
+import time
+import hashlib
 import logging
+import threading
+import uuid
+import itertools
+import math
 import traceback
+import zlib
+from multiprocessing.pool import ThreadPool
 import colander
+import iso8601
+from sqlalchemy import (and_, or_, func, inspect, bindparam, exists,
+                        select)
+from sqlalchemy.orm import (scoped_session,
+                            load_only,
+                            defaultload,
+                            joinedload,
+                            subqueryload,
+                            selectinload,
+                            )
+from sqlalchemy.sql.expression import literal_column
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext import baked
+from sqlalchemy.ext.associationproxy import _AssociationList
+from sqlalchemy.orm.dynamic import AppenderMixin
+from sqlalchemy.orm.query import Query
+import dictalchemy.utils
+from dictalchemy import constants as dictalchemy_constants
+from dictalchemy import errors as dictalchemy_errors
 from flask import (Response,
+                   stream_with_context,
                    url_for,
                    abort,
                    request,
                    redirect,
                    render_template,
                    current_app,
+                   after_this_request,
+                   has_request_context,
                    )
-from flask.ext.classy import FlaskView
+from flask.ext.classy import FlaskView, route
 from werkzeug.exceptions import HTTPException
+from werkzeug.http import is_resource_modified
 from jinja2.exceptions import TemplateNotFound
 
 
@@ -50,9 +84,64 @@ except ImportError:
     _ = _gettext
 
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_bakery = baked.bakery()
+
+
 _logger = logging.getLogger('flask.ext.alchemyview')
 """The logger that is used. It uses the 'flask.ext.alchemyview' name."""
 
+_identity_map_stats = collections.defaultdict(collections.Counter)
+"""Identity map hits and misses by view class
+
+See :meth:`AlchemyView._get_identity_map_stats`.
+"""
+
+_read_session_counters = collections.defaultdict(itertools.count)
+"""Round-robin counters for :attr:`AlchemyView.read_sessions` by view class"""
+
+_shard_pools = {}
+"""(size, thread pool) used to query :attr:`AlchemyView.shards` by view
+class"""
+
+_shard_pools_lock = threading.Lock()
+
+_count_cache = {}
+"""Counts cached by the 'cached' count strategy
+
+Maps (view class, sql, params) to (expires, count).
+"""
+
+_COUNT_CACHE_MAX_SIZE = 1000
+"""Max number of entries in :data:`_count_cache`"""
+
+_EAGER_LOADERS = {'selectin': selectinload,
+                  'joined': joinedload,
+                  'subquery': subqueryload}
+"""Loader options for the strategies in :attr:`AlchemyView.eager_load`"""
+
+_CACHED_HEADERS = ('ETag', 'Last-Modified', 'Content-Encoding', 'Vary')
+"""Response headers that are stored in a response cache"""
+
 
 def _remove_colander_null(result):
     """Removes colaner.null values from a dict or list
@@ -80,6 +169,70 @@ def _remove_colander_null(result):
                         type(result))
 
 
+def _find_null_nodes(node, nodes):
+    """Find the nodes whose null values :func:`_remove_colander_null` removes
+
+    Finds the children of mappings and the item node of sequences, following
+    mappings in mappings. Sequences aren't followed since
+    :func:`_remove_colander_null` doesn't remove nulls from items in lists.
+
+    :param node: A mapping or sequence node
+    :param nodes: List that the nodes that are deserialized to \
+            :attr:`colander.null` are added to
+
+    :returns: False if setting `missing` to :attr:`colander.drop` could \
+            change the result
+    """
+    if type(node.typ) not in (colander.Mapping, colander.Sequence):
+        return False
+    if node.validator is not None or node.preparer is not None:
+        # The validator would see the nulls before they are removed
+        return False
+    for child in node.children:
+        if child.missing is colander.null:
+            nodes.append(child)
+        if isinstance(node.typ, colander.Sequence):
+            continue
+        if isinstance(child.typ, (colander.Mapping, colander.Sequence)):
+            if not _find_null_nodes(child, nodes):
+                return False
+        elif type(child.typ).__module__ != colander.__name__:
+            # Unknown types could return dicts that contains nulls
+            return False
+    return True
+
+
+def _compile_validator(schema):
+    """Compile a function that validates data with `schema`
+
+    The function returns the same result as
+    ``_remove_colander_null(schema.deserialize(data))``. If possible the
+    nodes that are deserialized to :attr:`colander.null` are changed to be
+    dropped, so that colander leaves them out and the result doesn't have to
+    be copied. That isn't done if a validator or preparer could see the null
+    values, or if the schema contains unknown types.
+
+    :param schema: A colander schema instance, it's cloned and not changed
+
+    :returns: A function that takes the data and returns the validated data
+    """
+    schema = schema.clone()
+    nodes = []
+    if not _find_null_nodes(schema, nodes):
+        return lambda data: _remove_colander_null(schema.deserialize(data))
+
+    for node in nodes:
+        node.missing = colander.drop
+
+    def validate(data):
+        result = schema.deserialize(data)
+        if not isinstance(result, (dict, list)):
+            return _remove_colander_null(result)
+        return result
+
+    return validate
+
+
 def _exception_to_dict(error):
     """Get a dict from an Exception
 
@@ -109,30 +262,681 @@ def _exception_to_dict(error):
     return {u'message': _(u'Unknown error'), u'errors': {}}
 
 
-class _JSONEncoder(json.JSONEncoder):
-    """JSON Encoder class that handles conversion for a number of types not
-    supported by the default json library
+def _encode_cursor(data):
+    """Encode a pagination cursor
+
+    :param data: Dict that can be dumped by :class:`_JSONEncoder`
+
+    :returns: An opaque url-safe string
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps(data,
+                   cls=_JSONEncoder,
+                   separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    """Decode a cursor created by :func:`_encode_cursor`
+
+    :raises: ValueError if the cursor is invalid
+
+    :returns: The decoded dict
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(str(cursor)).
+                          decode('utf-8'))
+    except Exception:
+        raise ValueError("Invalid cursor %r" % cursor)
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor %r" % cursor)
+    return data
+
+
+def _parse_iso8601(value):
+    """Parse a datetime written with isoformat()
+
+    Naive values are returned naive and values with an offset keep it.
+
+    :raises: ValueError if the value can't be parsed
+
+    :returns: datetime.datetime
+    """
+    return iso8601.parse_date(value, default_timezone=None)
+
+
+def _coerce_cursor_value(expression, value):
+    """Convert a value decoded from a cursor to the type of an expression
+
+    Cursors are stored as json so datetime objects and Decimals has to be
+    converted back before they can be compared to the expression.
+
+    :raises: ValueError or TypeError if the value can't be converted
+
+    :returns: The converted value
+    """
+    try:
+        python_type = expression.type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+    if value is None:
+        return None
+    if python_type is datetime.datetime:
+        return _parse_iso8601(value)
+    elif python_type is datetime.date:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    elif python_type is datetime.time:
+        return _parse_iso8601(u'1970-01-01T%s' % value).timetz()
+    elif python_type is decimal.Decimal:
+        return decimal.Decimal(value)
+    elif python_type in (int, float) and not isinstance(value, python_type):
+        return python_type(value)
+    return value
+
+
+def _keyset_criterion(expressions, values, ascending=True):
+    """Get a criterion matching rows after `values` in a keyset ordering
+
+    For the expressions (a, b) and the values (1, 2) in ascending order the
+    criterion will be `a > 1 OR (a = 1 AND b > 2)`.
+
+    :param expressions: List of expressions that the query is ordered by
+    :param values: List of values, one for each expression
+    :param ascending: If the query is ordered ascending or descending
+
+    :returns: SQLAlchemy criterion
+    """
+    clauses = []
+    for i, expression in enumerate(expressions):
+        criterion = [expressions[j] == values[j] for j in range(i)]
+        if ascending:
+            criterion.append(expression > values[i])
+        else:
+            criterion.append(expression < values[i])
+        clauses.append(and_(*criterion))
+    return or_(*clauses)
+
+
+_PrimaryKeyColumn = collections.namedtuple('_PrimaryKeyColumn',
+                                           ['key',
+                                            'attribute',
+                                            'python_type',
+                                            'coerce'])
+"""A primary key column of a model
+
+:ivar key: Name of the mapped attribute
+:ivar attribute: The mapped attribute, used in queries
+:ivar python_type: Python type of the column or None if it's unknown
+:ivar coerce: Function that converts an id from an url to `python_type` or \
+        None if the type isn't supported
+"""
+
+_ViewMetadata = collections.namedtuple('_ViewMetadata',
+                                       ['model',
+                                        'primary_key',
+                                        'get_route_name',
+                                        'asdict_params',
+                                        'fromdict_params',
+                                        'serializer',
+                                        'field_serializers',
+                                        'eager_load_options',
+                                        'validators'])
+"""Model metadata for an :class:`AlchemyView`
+
+Created once per view by :meth:`AlchemyView._compile_metadata`.
+
+:ivar model: The model
+:ivar primary_key: Tuple of :data:`_PrimaryKeyColumn`
+:ivar get_route_name: Route name of :meth:`AlchemyView.get`
+:ivar asdict_params: Parameters used when calling asdict() on an item
+:ivar fromdict_params: Parameters used when calling fromdict() on an item
+:ivar serializer: :class:`_AsdictSerializer` for `asdict_params`
+:ivar field_serializers: Dict of fields=>:class:`_AsdictSerializer` used for \
+        sparse fieldsets, see :meth:`AlchemyView._get_fields`
+:ivar eager_load_options: Dict of fields=>loader options, filled by \
+        :meth:`AlchemyView._get_eager_load_options`
+:ivar validators: Dict of schema class=>validator, filled by \
+        :meth:`AlchemyView._get_validator`
+"""
 
 
+def _make_coercer(python_type):
+    """Get a function that converts a value from an url to `python_type`
+
+    :returns: A function or None if `python_type` isn't int or a string
+    """
+    if python_type not in (int, str, unicode):
+        return None
+
+    def coerce(value):
+        if type(value) != python_type:
+            value = python_type(value)
+        return value
+    return coerce
+
+
+_json_type_handlers = {
+    datetime.datetime: lambda obj: obj.isoformat(),
+    datetime.date: lambda obj: obj.isoformat(),
+    datetime.time: lambda obj: obj.isoformat(),
+    decimal.Decimal: unicode,
+    tuple: list,
+}
+"""Map of type=>function converting values not supported by json
+
+Subclasses are looked up through their mro and added to the map the first
+time they're seen. Tuple subclasses, like namedtuples, are only passed here
+by backends that don't encode them as arrays themselves.
+"""
+
+
+def _json_default(obj):
+    """Convert an object that isn't supported by json
+
+    Used as the `default` function of all json backends.
+
     - datetime.* objects will be converted with their isoformat() function.
     - Decimal will be converted to a unicode string
     - Any object with an asdict() method will be converted to a dict that is
       returned
 
+    :raises: TypeError if the object can't be converted
+
     :returns: object that can be converted to json
     """
+    handler = _json_type_handlers.get(obj.__class__)
+    if handler is None:
+        for cls in obj.__class__.__mro__[1:]:
+            if cls in _json_type_handlers:
+                handler = _json_type_handlers[obj.__class__] = \
+                    _json_type_handlers[cls]
+                break
+    if handler is not None:
+        return handler(obj)
+    asdict = getattr(obj, 'asdict', None)
+    if callable(asdict):
+        return asdict()
+    raise TypeError("%r is not JSON serializable" % obj)
+
+
+def _uses_dictalchemy_asdict(cls, method='asdict'):
+    """Check if `method` on a class is :func:`dictalchemy.utils.asdict`
+
+    :returns: bool
+    """
+    fn = getattr(cls, method, None)
+    return getattr(fn, '__func__', fn) is dictalchemy.utils.asdict
 
-    def default(self, obj):
-        if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
-            return obj.isoformat()
-        elif isinstance(obj, (decimal.Decimal)):
-            return unicode(obj)
-        elif hasattr(obj, 'asdict') and callable(getattr(obj, 'asdict')):
-            return obj.asdict()
+
+class _AsdictSerializer(object):
+    """Compiled replacement for :func:`dictalchemy.utils.asdict`
+
+    Returns the same dicts as calling `asdict(**params)` on an item. The
+    attributes to read and the relationships to follow are worked out once
+    per class, instead of on every call. Classes that don't use the
+    dictalchemy asdict will have their own asdict method called.
+    """
+
+    def __init__(self, params):
+        """Create an _AsdictSerializer
+
+        :param params: Parameters that would be passed to asdict()
+        """
+        self.params = params
+        self._plans = {}
+
+    def __call__(self, item):
+        plan = self._plans.get(item.__class__)
+        if plan is None:
+            plan = self._plans[item.__class__] = self._compile(item.__class__)
+        return plan(item)
+
+    def _compile(self, cls):
+        """Compile the serializer for a class
+
+        :returns: Function that takes an item and returns a dict
+        """
+        params = self.params
+        if not _uses_dictalchemy_asdict(cls):
+            return lambda item: item.asdict(**copy.deepcopy(params))
+
+        params = dict(params)
+        follow = dictalchemy.utils.arg_to_dict(params.pop('follow', None))
+        only = params.pop('only', None)
+        exclude = list(params.pop('exclude', None) or [])
+        exclude_underscore = params.pop('exclude_underscore', None)
+        exclude_pk = params.pop('exclude_pk', None)
+        include = params.pop('include', None)
+        method = params.pop('method', 'asdict')
+        kwargs = params
+
+        mapper = inspect(cls)
+        columns = [c.key for c in mapper.column_attrs]
+        synonyms = [c.key for c in mapper.synonyms]
+        if only:
+            attrs = list(only)
         else:
+            exclude += getattr(cls, 'dictalchemy_exclude',
+                               dictalchemy_constants.default_exclude) or []
+            if exclude_underscore is None:
+                exclude_underscore = getattr(
+                    cls,
+                    'dictalchemy_exclude_underscore',
+                    dictalchemy_constants.default_exclude_underscore)
+            if exclude_underscore:
+                exclude += [k.key for k in mapper.attrs if k.key[0] == '_']
+            if exclude_pk is True:
+                exclude += [c.key for c in mapper.primary_key]
+            include = (include or []) + (getattr(cls,
+                                                 'dictalchemy_asdict_include',
+                                                 getattr(cls,
+                                                         'dictalchemy_include',
+                                                         None)) or [])
+            attrs = [k for k in columns + synonyms + include
+                     if k not in exclude]
+
+        follows = []
+        for (rel_key, orig_args) in follow.items():
+            args = copy.deepcopy(orig_args)
+            rel_method = args.pop('method', method)
+            args['method'] = rel_method
+            args.update(copy.copy(kwargs))
+            follows.append((rel_key,
+                            rel_method,
+                            args,
+                            args.get('parent', None),
+                            _AsdictSerializer(args)
+                            if rel_method == 'asdict' else None))
+
+        if len(attrs) > 1:
+            getter = operator.attrgetter(*attrs)
+        elif attrs:
+            getter = lambda item: (getattr(item, attrs[0]),)
+        else:
+            getter = lambda item: ()
+
+        def serialize(item):
+            data = dict(zip(attrs, getter(item)))
+            for (rel_key, rel_method, args, parent, serializer) in follows:
+                try:
+                    rel = getattr(item, rel_key)
+                except AttributeError:
+                    raise dictalchemy_errors.MissingRelationError(rel_key)
+                rel_data = _serialize_relation(rel_key, rel, rel_method,
+                                               args, serializer)
+                if parent is None:
+                    data[rel_key] = rel_data
+                else:
+                    data.setdefault(parent, {})[rel_key] = rel_data
+            return data
+
+        return serialize
+
+
+def _serialize_child(child, method, args, serializer):
+    """Serialize a related item like :func:`dictalchemy.utils.asdict`
+
+    :param serializer: :class:`_AsdictSerializer` or None, used if `method`
+        is the dictalchemy asdict
+    """
+    if serializer is not None and _uses_dictalchemy_asdict(child.__class__,
+                                                           method):
+        return serializer(child)
+    return getattr(child, method)(**copy.deepcopy(args))
+
+
+def _serialize_relation(rel_key, rel, method, args, serializer):
+    """Serialize a followed relationship like :func:`dictalchemy.utils.asdict`
+
+    :raises: :class:`dictalchemy.errors.UnsupportedRelationError` if the
+        relationship isn't supported
+
+    :returns: Serialized data
+    """
+    if hasattr(rel, method):
+        return _serialize_child(rel, method, args, serializer)
+    elif isinstance(rel, (list, _AssociationList)):
+        rel_data = []
+        for child in rel:
+            if hasattr(child, method):
+                rel_data.append(_serialize_child(child, method, args,
+                                                 serializer))
+            else:
+                try:
+                    rel_data.append(dict(child))
+                except TypeError:
+                    rel_data.append(copy.copy(child))
+        return rel_data
+    elif isinstance(rel, dict):
+        rel_data = {}
+        for (child_key, child) in rel.items():
+            if hasattr(child, method):
+                rel_data[child_key] = _serialize_child(child, method, args,
+                                                       serializer)
+            else:
+                try:
+                    rel_data[child_key] = dict(child)
+                except ValueError:
+                    rel_data[child_key] = copy.copy(child)
+        return rel_data
+    elif isinstance(rel, (AppenderMixin, Query)):
+        rel_data = []
+        for child in rel.all():
+            if hasattr(child, method):
+                rel_data.append(_serialize_child(child, method, args,
+                                                 serializer))
+            else:
+                rel_data.append(dict(child))
+        return rel_data
+    elif rel is None:
+        return None
+    raise dictalchemy_errors.UnsupportedRelationError(rel_key)
+
+
+class _JSONEncoder(json.JSONEncoder):
+    """JSON Encoder class that handles conversion for a number of types not
+    supported by the default json library
+
+    See :func:`_json_default` for the conversions.
+
+    :returns: object that can be converted to json
+    """
+
+    def default(self, obj):
+        try:
+            return _json_default(obj)
+        except TypeError:
             return json.JSONEncoder.default(self, obj)
 
 
+class JSONBackend(object):
+    """Interface for json backends used by :attr:`AlchemyView.json_backend`
+
+    Backends must handle the same types as :func:`_json_default`.
+    """
+
+    def dumps(self, obj):
+        """Dump an object to a json string
+
+        :returns: Unicode string
+        """
+        raise NotImplementedError()
+
+    def loads(self, string):
+        """Load a json string"""
+        return json.loads(string)
+
+
+class StdlibJSONBackend(JSONBackend):
+    """Json backend using the json module in the standard library"""
+
+    def __init__(self, encoder=_JSONEncoder):
+        """Create a StdlibJSONBackend
+
+        :param encoder: :class:`json.JSONEncoder` subclass used when dumping
+        """
+        self.encoder = encoder
+
+    def dumps(self, obj):
+        return json.dumps(obj, cls=self.encoder, ensure_ascii=False)
+
+
+class SimplejsonBackend(JSONBackend):
+    """Json backend using simplejson and its C extension
+
+    Namedtuples are encoded as arrays like the json module does.
+    """
+
+    def dumps(self, obj):
+        return simplejson.dumps(obj,
+                                default=_json_default,
+                                ensure_ascii=False,
+                                use_decimal=False,
+                                namedtuple_as_object=False,
+                                tuple_as_array=True)
+
+    def loads(self, string):
+        return simplejson.loads(string)
+
+
+class OrjsonBackend(JSONBackend):
+    """Json backend using orjson
+
+    Datetime objects are passed to :func:`_json_default` so they're encoded
+    the same way as with the other backends.
+    """
+
+    def dumps(self, obj):
+        return orjson.dumps(obj,
+                            default=_json_default,
+                            option=(orjson.OPT_PASSTHROUGH_DATETIME |
+                                    orjson.OPT_NON_STR_KEYS)).decode('utf-8')
+
+    def loads(self, string):
+        return orjson.loads(string)
+
+
+def _get_default_json_backend():
+    """Get the fastest json backend that is installed
+
+    :returns: :class:`JSONBackend`
+    """
+    if orjson is not None:
+        return OrjsonBackend()
+    elif simplejson is not None:
+        return SimplejsonBackend()
+    return StdlibJSONBackend()
+
+
+_default_json_backend = _get_default_json_backend()
+"""The json backend used if :attr:`AlchemyView.json_backend` isn't set"""
+
+
+class MessagePackEncoder(object):
+    """Encoder for MessagePack using msgpack
+
+    Handles the same types as :func:`_json_default`, so responses contain the
+    same data as json responses.
+    """
+
+    mimetype = 'application/x-msgpack'
+    """The mimetype for MessagePack"""
+
+    def dumps(self, obj):
+        """Dump an object to MessagePack
+
+        :returns: Bytes
+        """
+        return msgpack.packb(obj, default=_json_default, use_bin_type=False)
+
+    def loads(self, data):
+        """Load MessagePack bytes"""
+        return msgpack.unpackb(data, raw=False)
+
+
+def _get_default_encoders():
+    """Get the encoders that can be used with the installed packages
+
+    :returns: Dict of mimetype=>encoder
+    """
+    encoders = {}
+    if msgpack is not None:
+        encoders[MessagePackEncoder.mimetype] = MessagePackEncoder()
+    return encoders
+
+
+_default_encoders = _get_default_encoders()
+"""The encoders used if :attr:`AlchemyView.encoders` isn't set"""
+
+
+def _chunked(strings, size=8192):
+    """Join strings into chunks of at least `size` characters
+
+    Used when streaming responses so each item isn't written separately.
+
+    :param strings: Iterable of strings
+
+    :returns: Generator of strings
+    """
+    chunk = []
+    length = 0
+    for string in strings:
+        chunk.append(string)
+        length += len(string)
+        if length >= size:
+            yield u''.join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield u''.join(chunk)
+
+
+def _sizeof(value):
+    """Get the approximate size in bytes of a cached value
+
+    Strings count with their length, everything else as 8 bytes.
+
+    :returns: Integer
+    """
+    if isinstance(value, basestring):
+        return len(value)
+    elif isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    return 8
+
+
+class ResponseCache(object):
+    """Interface for response caches
+
+    A response cache is set with :attr:`AlchemyView.response_cache`. Keys are
+    strings and values are tuples of strings and integers, so a shared
+    backend, for example one using memcached or redis, can store them
+    serialized.
+    """
+
+    def get(self, key):
+        """Get a value
+
+        :returns: The value or None if it's missing or expired
+        """
+        raise NotImplementedError()
+
+    def set(self, key, value):
+        """Set a value"""
+        raise NotImplementedError()
+
+    def delete(self, *keys):
+        """Delete values, missing keys are ignored"""
+        raise NotImplementedError()
+
+
+class LRUResponseCache(ResponseCache):
+    """In-process least-recently-used response cache
+
+    Values expire after `ttl` seconds and the least recently used values are
+    evicted when the total size exceeds `max_bytes`. The cache is thread
+    safe.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=60):
+        """Create a LRUResponseCache
+
+        :param max_bytes: Max total size of keys and values
+        :param ttl: Seconds before a value expires
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            (expires, size, value) = entry
+            if expires <= time.time():
+                self._size -= size
+                return None
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        size = _sizeof(key) + _sizeof(value)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.time() + self.ttl, size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._size -= self._entries.popitem(last=False)[1][1]
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._size -= entry[1]
+
+
+class ShardResolver(object):
+    """Interface for shard resolvers
+
+    A shard resolver is set with :attr:`AlchemyView.shard_resolver` and
+    chooses which of :attr:`AlchemyView.shards` an item is stored in.
+    """
+
+    def shard_for_primary_key(self, primary_key, shard_ids):
+        """Get the shard of an existing item
+
+        :param primary_key: Dict of primary key name=>value
+        :param shard_ids: Sorted list of shard ids
+
+        :returns: A shard id
+        """
+        raise NotImplementedError()
+
+    def shard_for_data(self, data, shard_ids):
+        """Get the shard a new item should be created in
+
+        :param data: The validated data
+        :param shard_ids: Sorted list of shard ids
+
+        :raises: KeyError if the shard key is missing in the data
+
+        :returns: A shard id
+        """
+        raise NotImplementedError()
+
+
+class ModuloShardResolver(ShardResolver):
+    """Shard resolver using the value of one primary key column
+
+    Integers are taken modulo the number of shards and other values are
+    hashed with crc32 first. The key must be in the data when an item is
+    created, so it can't be autoincremented.
+
+    :param key: Name of a primary key attribute
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    def shard_for_primary_key(self, primary_key, shard_ids):
+        return self._shard_for_value(primary_key[self.key], shard_ids)
+
+    def shard_for_data(self, data, shard_ids):
+        return self._shard_for_value(data[self.key], shard_ids)
+
+    def _shard_for_value(self, value, shard_ids):
+        if not isinstance(value, (int, long)):
+            value = zlib.crc32(unicode(value).encode('utf-8')) & 0xffffffff
+        return shard_ids[value % len(shard_ids)]
+
+
 class BadRequest(HTTPException):
     """HTTPException class that also contains error data
 
@@ -172,8 +976,30 @@ class AlchemyView(FlaskView):
     application/json.
     """
 
+    json_backend = None
+    """The :class:`JSONBackend` used to load/dump json
+
+    If not set the fastest installed backend will be used: orjson,
+    simplejson or the json module in the standard library.
+    """
+
+    encoders = None
+    """Map of mimetype=>encoder for responses and request data besides json
+
+    An encoder has the methods dumps() and loads(), see
+    :class:`MessagePackEncoder`. The mimetypes are used in content
+    negotiation, and POST and PUT data with one of the mimetypes is loaded
+    with the encoder. If not set MessagePack is used if msgpack is installed.
+    Set to {} to only use json.
+    """
+
     JSONEncoder = _JSONEncoder
-    """The JSON Encoder that should be used to load/dump json"""
+    """The JSON Encoder that should be used to dump json
+
+    Deprecated, use :attr:`AlchemyView.json_backend`. If this is set to
+    something else than the default a :class:`StdlibJSONBackend` using it
+    will be used.
+    """
 
     session = None
     """The SQLAlchemy session
@@ -182,6 +1008,53 @@ class AlchemyView(FlaskView):
     If that is missing the view will not work.
     """
 
+    read_sessions = None
+    """Sessions connected to read replicas
+
+    A list of sessions or :class:`sqlalchemy.orm.scoped_session`. If set GET
+    and HEAD requests use one of them, chosen with
+    :attr:`AlchemyView.read_session_strategy`, and all other requests use
+    :attr:`AlchemyView.session`.
+    """
+
+    read_session_strategy = 'round_robin'
+    """How a read session is chosen
+
+    'round_robin' or 'least_connections', which chooses the session whose
+    engine has the fewest checked out connections.
+    """
+
+    read_your_writes_window = 5
+    """Seconds after a write that the same client reads from the primary
+
+    The time of the last write is stored in the cookie
+    :attr:`AlchemyView.read_your_writes_cookie`. Only used with
+    :attr:`AlchemyView.read_sessions`. Set to 0 to always read from the
+    replicas.
+    """
+
+    read_your_writes_cookie = 'alchemyview_last_write'
+    """Name of the cookie used for :attr:`AlchemyView.read_your_writes_window`
+    """
+
+    shards = None
+    """Sessions of the shards the model is split across
+
+    A dict of shard id=>session. If set :attr:`AlchemyView.shard_resolver`
+    chooses the shard of each item, and :meth:`AlchemyView.index` queries
+    all shards in parallel and merges the results. Bulk requests, cursor
+    pagination and :meth:`AlchemyView._export` are not supported on sharded
+    views.
+
+    The merge compares the sortby values in Python, so string sortby columns
+    must use a binary collation, for example `Model.name.collate('C')` in
+    :attr:`AlchemyView.sortby_map` on PostgreSQL. NULLs are sorted first in
+    ascending order on every shard.
+    """
+
+    shard_resolver = None
+    """The :class:`ShardResolver` used with :attr:`AlchemyView.shards`"""
+
     model = None
     """SQLAlchemy declarative model"""
 
@@ -200,153 +1073,1440 @@ class AlchemyView(FlaskView):
     :attr:`AlchemyView.asdict_params` and
     :attr:`AlchemyView.from_params` if they're not set"""
 
-    asdict_params = None
-    """Parameters that will be used when getting an item
+    asdict_params = None
+    """Parameters that will be used when getting an item
+
+    The parameters will be used in :meth:`dictalchemy.utils.asdict`.
+    """
+
+    fromdict_params = None
+    """Parameters that will be used when updating an item
+
+    The parameters will be used in :meth:`dictalchemy.utils.fromdict`.
+    """
+
+    max_page_limit = 50
+    """Max page limit"""
+
+    page_limit = 10
+    """Default page limit"""
+
+    sortby = None
+    """Default sortby column
+
+    If not set no sortby will be applied by default in
+    :func:`AlchemyView.index`.
+
+    In order for sortby to have any effect it also needs to be set in
+    :attr:`AlchemyView.sortby_map`
+    """
+
+    sort_direction = 'asc'
+    """Default sort direction"""
+
+    sortby_map = None
+    """Map of string=>column for sortby
+
+    The values can be anything that will work together with the query returned
+    by :meth:`AlchemyView._base_query`. So if there is a join
+    in the base query that column, or name of that colum can be mapped to a key
+    in the sortby_map. Names are not allowed if :attr:`AlchemyView.shards`
+    is set.
+    """
+
+    filter_map = None
+    """Map of string=>(column, operators) for filtering the listing
+
+    The operators are a list of 'eq', 'in', 'range' and 'prefix'. Example::
+
+        filter_map = {'name': (User.name, ['eq', 'prefix']),
+                      'age': (User.age, ['range']),
+                      'group': (User.group_id, ['eq', 'in'])}
+
+    This allows the arguments `name=Bob`, `name__prefix=B`, `age__range=18,30`,
+    `group=1` and `group__in=1,2,3` in :meth:`AlchemyView.index`. Either end
+    of a range can be left out, `age__range=18,` matches 18 and older. The
+    filters are added to the query as bound parameters, so they can use the
+    database indexes. The names must not be the same as other arguments to
+    the listing.
+    """
+
+    cursor_pagination = False
+    """Use cursor(keyset) pagination in :meth:`AlchemyView.index`
+
+    When set the `offset` argument is ignored and the response will contain
+    the opaque cursors `next` and `prev` instead of `offset`. A cursor is
+    passed back with the `cursor` argument. The primary key is always added
+    to the ordering so the pages are stable even if the sortby column isn't
+    unique. Columns in :attr:`AlchemyView.sortby_map` used with cursor
+    pagination should not be nullable.
+    """
+
+    count_strategy = 'exact'
+    """How the `count` in :meth:`AlchemyView.index` is calculated
+
+    - 'exact': Count all rows matching the query
+    - 'window': Exact count fetched together with the page using \
+            `count(*) OVER ()`, see :meth:`AlchemyView._supports_window_count`.
+            Falls back to 'exact' if the dialect doesn't support it or if \
+            cursor pagination is used.
+    - 'none': Don't count, count will be None
+    - 'capped': Count at most :attr:`AlchemyView.count_cap` rows
+    - 'cached': Exact count cached for :attr:`AlchemyView.count_cache_ttl` \
+            seconds per query
+    - 'estimated': Use the query planner estimate, currently only supported \
+            on PostgreSQL. Other dialects will use an exact count.
+
+    The response will contain `count_type` that tells which kind of count was
+    returned, see :meth:`AlchemyView._count`.
+    """
+
+    count_cap = 1000
+    """Max count when :attr:`AlchemyView.count_strategy` is 'capped'"""
+
+    count_cache_ttl = 60
+    """Seconds a count is cached when :attr:`AlchemyView.count_strategy` is
+    'cached'"""
+
+    cache_item_statement = True
+    """Cache the statement used by :meth:`AlchemyView._get_item`
+
+    The query is built and compiled once per view class with
+    :mod:`sqlalchemy.ext.baked`. The cache is only used if
+    :meth:`AlchemyView._base_query` isn't overridden or if
+    :attr:`AlchemyView.static_base_query` is set.
+    """
+
+    identity_map_lookup = True
+    """Look for items in the session identity map before querying
+
+    Items already loaded in the session and not expired are returned by
+    :meth:`AlchemyView._get_item` without any SQL. Only used if
+    :meth:`AlchemyView._base_query` isn't overridden. The hit rate can be read
+    with :meth:`AlchemyView._get_identity_map_stats`.
+    """
+
+    static_base_query = False
+    """Set if an overridden :meth:`AlchemyView._base_query` always returns the
+    same query
+
+    The query must not depend on the request, for example by filtering on the
+    current user, since it will only be built once.
+    """
+
+    response_cache = None
+    """Cache for responses from :meth:`AlchemyView.get` and
+    :meth:`AlchemyView.index`
+
+    An instance of :class:`ResponseCache`, for example
+    :class:`LRUResponseCache`. Responses are cached per view, id or index
+    arguments and response mimetype. :meth:`AlchemyView.post`,
+    :meth:`AlchemyView.put` and :meth:`AlchemyView._delete` invalidate the
+    item and all index responses of the view.
+
+    Only use a response cache if the responses doesn't depend on the current
+    user, or override :meth:`AlchemyView._cache_key`.
+    """
+
+    conditional_responses = False
+    """Handle conditional requests in :meth:`AlchemyView.get` and
+    :meth:`AlchemyView.index`
+
+    Responses get an ETag header and a 304 is returned if the request
+    contains a matching If-None-Match or If-Modified-Since header. The ETag
+    is a hash of the response body unless
+    :attr:`AlchemyView.version_column` is set.
+    """
+
+    version_column = None
+    """Name of a version attribute used for the ETag in
+    :meth:`AlchemyView.get`
+
+    The attribute must change every time the item changes, for example a
+    version counter or an updated_at timestamp. When set a 304 is decided
+    before the item is serialized.
+    """
+
+    last_modified_column = None
+    """Name of a datetime attribute used for the Last-Modified header in
+    :meth:`AlchemyView.get`"""
+
+    compress_responses = False
+    """Compress responses from :meth:`AlchemyView._response`
+
+    Responses are compressed with brotli, if the brotli package is installed
+    and the client accepts it, or gzip. When
+    :attr:`AlchemyView.response_cache` is set the compressed responses are
+    cached, so they're only compressed once.
+    """
+
+    compress_min_size = 1024
+    """Responses smaller than this number of bytes are not compressed"""
+
+    compress_level = 6
+    """Compression level, 1-9
+
+    Used as the quality for brotli.
+    """
+
+    stream_index = False
+    """Stream JSON responses from :meth:`AlchemyView.index`
+
+    The items are fetched in batches of :attr:`AlchemyView.stream_batch_size`
+    with `yield_per` and encoded one at a time, so the memory used doesn't
+    grow with the page size. Only used with offset pagination. Streamed
+    responses are not cached, don't get a body ETag and don't use the
+    'window' count strategy. `yield_per` can't be combined with joined eager
+    loading of collections.
+    """
+
+    stream_batch_size = 100
+    """Number of rows fetched per batch when streaming"""
+
+    export_batch_size = 1000
+    """Number of rows fetched per batch by :meth:`AlchemyView._export`"""
+
+    compiled_serializer = True
+    """Use a compiled serializer instead of calling asdict() on every item
+
+    The serializer returns the same dicts as asdict() with
+    :attr:`AlchemyView.asdict_params` but works out the attributes and
+    relationships once per model instead of once per item. Models with their
+    own asdict() method will still have it called. See
+    :meth:`AlchemyView._asdict`.
+    """
+
+    sparse_fields = None
+    """Fields that can be selected with the `fields` argument
+
+    If set, GET and index takes the argument `fields`, a comma separated list
+    of names from this list. Only those fields will be returned, and only
+    those columns will be loaded from the database. Followed relationships in
+    :attr:`AlchemyView.asdict_params` are only returned if they are in
+    `fields`. If not set the `fields` argument is ignored.
+    """
+
+    eager_load = None
+    """Relationships that are eager loaded in :meth:`AlchemyView.index`
+
+    A dict of relationship path=>strategy, where the path is relationship
+    names separated with '.' and the strategy is 'selectin', 'joined' or
+    'subquery'. Example::
+
+        eager_load = {'group': 'joined', 'posts': 'selectin',
+                      'posts.tags': 'selectin'}
+
+    If not set the relationships followed in
+    :attr:`AlchemyView.asdict_params` are loaded with 'selectin'. Set to {}
+    to disable eager loading. When the app is in debug mode a warning is
+    logged if a followed relationship isn't loaded before serialization.
+    """
+
+    bulk_create = False
+    """Create many items with one POST
+
+    If set, POST to the listing URL takes a JSON array of items. Every item
+    is validated with :meth:`AlchemyView._get_create_schema` and the items are
+    inserted with one executemany and one commit. See
+    :meth:`AlchemyView._bulk_post`.
+    """
+
+    bulk_update = False
+    """Update many items with one PUT or PATCH
+
+    If set, PUT and PATCH to the listing URL takes a JSON array of items
+    that contains the item id and the new values. See
+    :meth:`AlchemyView.update_many`.
+    """
+
+    bulk_delete = False
+    """Delete many items with one DELETE
+
+    If set, DELETE to the listing URL deletes the items matching a list of
+    ids or a filter. See :meth:`AlchemyView.delete_many`.
+    """
+
+    delete_filter_map = None
+    """Filters allowed in :meth:`AlchemyView.delete_many`
+
+    A dict of name=>column. Example::
+
+        delete_filter_map = {'group': User.group_id}
+    """
+
+    delete_without_select = False
+    """Delete single items without loading them first
+
+    If set :meth:`AlchemyView._delete` runs one DELETE statement filtered by
+    :meth:`AlchemyView._base_query` instead of loading the item and deleting
+    it with the session. ORM cascades and delete events are not run, so
+    only set this if the database handles the cascades.
+    """
+
+    max_bulk_size = 1000
+    """Max number of items in one bulk request"""
+
+    template_suffixes = {'text/html': 'jinja2'}
+    """Suffixes for response types, currently 'text/html' is the only one
+    supported"""
+
+    def _get_json_backend(self):
+        """Get the json backend
+
+        :returns: :class:`JSONBackend`
+        """
+        if self.json_backend is not None:
+            return self.json_backend
+        elif self.JSONEncoder is not _JSONEncoder:
+            return StdlibJSONBackend(self.JSONEncoder)
+        return _default_json_backend
+
+    def _json_dumps(self, obj, ensure_ascii=False, **kwargs):
+        """Dump object to a json string
+
+        Uses :meth:`AlchemyView._get_json_backend` to dump the data. If any
+        keyword arguments are given, or `ensure_ascii` is set, the json module
+        will be used with :attr:`AlchemyView.JSONEncoder`.
+
+        :param obj: Object that should be dumped
+
+        :returns: JSON string
+        """
+        if ensure_ascii or kwargs:
+            kwargs['ensure_ascii'] = ensure_ascii
+            kwargs['cls'] = self.JSONEncoder
+            return json.dumps(obj, **kwargs)
+        return self._get_json_backend().dumps(obj)
+
+    def _json_loads(self, string, **kwargs):
+        """Load json
+
+        Uses :meth:`AlchemyView._get_json_backend` unless keyword arguments
+        are given.
+        """
+        if kwargs:
+            return json.loads(string, **kwargs)
+        return self._get_json_backend().loads(string)
+
+    def _get_encoders(self):
+        """Get the encoders for all machine readable mimetypes
+
+        The json backend is used for 'application/json'.
+
+        :returns: Dict of mimetype=>encoder
+        """
+        encoders = dict(_default_encoders if self.encoders is None
+                        else self.encoders)
+        encoders['application/json'] = self._get_json_backend()
+        return encoders
+
+    def _encoded_response(self, obj, mimetype, status=200):
+        """Get a response encoded with the encoder for `mimetype`
+
+        :param obj: Exception OR something that can be dumped by the encoder.
+            If this is an exception the status will be set to 400 if status
+            is less than 400.
+        """
+        if mimetype == 'application/json':
+            return self._json_response(obj, status)
+        if isinstance(obj, Exception):
+            if status < 400:
+                status = 400
+            obj = _exception_to_dict(obj)
+        return Response(self._get_encoders()[mimetype].dumps(obj),
+                        status=status,
+                        mimetype=mimetype)
+
+    def _get_request_data(self):
+        """Get the data in the request body
+
+        Data with a mimetype in :attr:`AlchemyView.encoders` is loaded with
+        that encoder, everything else is loaded as json.
+
+        :returns: The data or None, calls flask.abort(400) if the data can't \
+                be loaded
+        """
+        mimetype = request.mimetype
+        if mimetype != 'application/json':
+            encoder = self._get_encoders().get(mimetype)
+            if encoder is not None:
+                try:
+                    return encoder.loads(request.get_data())
+                except Exception:
+                    abort(400)
+        return request.json
+
+    def _get_content_encoding(self):
+        """Get the encoding responses to this request are compressed with
+
+        :returns: 'br', 'gzip' or None if the response shouldn't be \
+                compressed
+        """
+        if not self.compress_responses:
+            return None
+        encodings = ['gzip']
+        if brotli is not None:
+            encodings.insert(0, 'br')
+        best = max(encodings, key=lambda e: request.accept_encodings[e])
+        return best if request.accept_encodings[best] else None
+
+    def _compress(self, response):
+        """Compress a response with :meth:`AlchemyView._get_content_encoding`
+
+        Streamed responses, responses that are already encoded and responses
+        smaller than :attr:`AlchemyView.compress_min_size` are not
+        compressed.
+
+        :returns: The response, converted to a :class:`flask.Response`
+        """
+        if not self.compress_responses:
+            return response
+        if not isinstance(response, Response):
+            response = Response(response, mimetype='text/html')
+        if response.is_streamed or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self._get_content_encoding()
+        data = response.get_data()
+        if encoding is None or len(data) < self.compress_min_size:
+            return response
+        if encoding == 'br':
+            data = brotli.compress(data, quality=self.compress_level)
+        else:
+            compressor = zlib.compressobj(self.compress_level,
+                                          zlib.DEFLATED,
+                                          16 + zlib.MAX_WBITS)
+            data = compressor.compress(data) + compressor.flush()
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _json_response(self, obj, status=200):
+        """Get a json response
+
+        :param obj: Exception OR something that can used by
+            :meth:`AlchemyView._json_dumps`
+            If this is an exception the status will be
+            set to 400 if status is less than 400.
+        """
+        if isinstance(obj, Exception):
+            if status < 400:
+                status = 400
+            obj = _exception_to_dict(obj)
+
+        return Response(self._json_dumps(obj),
+                        status=status,
+                        mimetype='application/json')
+
+    def _asdict(self, item, fields=None):
+        """Get a dict from an item using :attr:`AlchemyView.asdict_params`
+
+        :param fields: Tuple of fields returned by \
+                :meth:`AlchemyView._get_fields`. If set only those fields \
+                will be in the dict.
+
+        :returns: dict
+        """
+        metadata = self._get_metadata()
+        if fields:
+            serializer = metadata.field_serializers.get(fields)
+            if serializer is None:
+                serializer = _AsdictSerializer(
+                    self._get_fields_asdict_params(fields))
+                if len(metadata.field_serializers) < 256:
+                    metadata.field_serializers[fields] = serializer
+            return serializer(item)
+        elif self.compiled_serializer:
+            return metadata.serializer(item)
+        return item.asdict(**metadata.asdict_params)
+
+    def _get_fields(self):
+        """Get the fields selected by the `fields` argument
+
+        See :attr:`AlchemyView.sparse_fields`.
+
+        :raises: ValueError if a field isn't in \
+                :attr:`AlchemyView.sparse_fields`
+
+        :returns: Sorted tuple of fields or None if all fields should be \
+                returned
+        """
+        fields = request.args.get('fields', None)
+        if not fields or self.sparse_fields is None:
+            return None
+        fields = tuple(sorted(set(f.strip() for f in fields.split(u',')
+                                  if f.strip())))
+        for field in fields:
+            if field not in self.sparse_fields:
+                raise ValueError("Invalid field %r" % field)
+        return fields or None
+
+    def _get_fields_asdict_params(self, fields):
+        """Get asdict params that only returns `fields`
+
+        If all fields are followed relationships the primary key is returned
+        with them, since an empty `only` means all columns to asdict().
+
+        :returns: dict
+        """
+        params = dict(self._get_metadata().asdict_params)
+        follow = dictalchemy.utils.arg_to_dict(params.pop('follow', None))
+        params['follow'] = dict((k, v) for (k, v) in follow.items()
+                                if k in fields)
+        params['only'] = ([f for f in fields if f not in follow] or
+                          [column.key for column
+                           in self._get_metadata().primary_key])
+        return params
+
+    def _get_fields_columns(self, fields):
+        """Get the column attributes in `fields`
+
+        :returns: Tuple of attribute names, the primary key if no field is a \
+                column
+        """
+        columns = set(c.key for c in inspect(self.model).column_attrs)
+        return (tuple(f for f in fields if f in columns) or
+                tuple(column.key for column
+                      in self._get_metadata().primary_key))
+
+    def _apply_fields(self, query, fields):
+        """Only load the columns in `fields`
+
+        The primary key is always loaded.
+
+        :returns: The query
+        """
+        if not fields:
+            return query
+        columns = self._get_fields_columns(fields)
+        return query.options(load_only(*columns)) if columns else query
+
+    def _get_filters(self):
+        """Get the filters in the request arguments
+
+        See :attr:`AlchemyView.filter_map`. The values are converted to the
+        python type of the column if it's int or a string.
+
+        :raises: ValueError if a value can't be converted
+
+        :returns: Sorted tuple of (name, operator, value) where value is a \
+                tuple for 'in' and 'range'
+        """
+        if not self.filter_map:
+            return ()
+        filters = []
+        for (arg, value) in request.args.iteritems():
+            (name, separator, op) = arg.partition(u'__')
+            op = op or u'eq'
+            if name not in self.filter_map:
+                continue
+            (column, operators) = self.filter_map[name]
+            if op not in operators:
+                raise ValueError("Invalid filter %r" % arg)
+            try:
+                coerce = _make_coercer(column.type.python_type)
+            except (AttributeError, NotImplementedError):
+                coerce = None
+            coerce = coerce or (lambda v: v)
+            if op == u'in':
+                value = tuple(coerce(v) for v in value.split(u','))
+            elif op == u'range':
+                bounds = value.split(u',')
+                if len(bounds) != 2 or not any(bounds):
+                    raise ValueError("Invalid range %r" % value)
+                value = tuple(coerce(v) if v else None for v in bounds)
+            else:
+                value = coerce(value)
+            filters.append((name, op, value))
+        return tuple(sorted(filters))
+
+    def _apply_filters(self, query, filters):
+        """Add filters from :meth:`AlchemyView._get_filters` to a query
+
+        :returns: The query
+        """
+        for (name, op, value) in filters:
+            column = self.filter_map[name][0]
+            if op == u'eq':
+                query = query.filter(column == value)
+            elif op == u'in':
+                query = query.filter(column.in_(value))
+            elif op == u'range':
+                if value[0] is not None:
+                    query = query.filter(column >= value[0])
+                if value[1] is not None:
+                    query = query.filter(column <= value[1])
+            elif op == u'prefix':
+                query = query.filter(column.startswith(value,
+                                                       autoescape=True))
+        return query
+
+    def _get_eager_load_plan(self):
+        """Get the relationships that should be eager loaded
+
+        Uses :attr:`AlchemyView.eager_load` or the relationships followed in
+        :attr:`AlchemyView.asdict_params`.
+
+        :returns: List of (path, strategy) where path is a tuple of \
+                relationship names
+        """
+        if self.eager_load is not None:
+            return [(tuple(path.split('.')), strategy)
+                    for (path, strategy) in sorted(self.eager_load.items())]
+
+        plan = []
+
+        def add_follow(mapper, follow, parent_path):
+            for (key, args) in sorted(
+                    dictalchemy.utils.arg_to_dict(follow).items()):
+                relationship = mapper.relationships.get(key)
+                if relationship is None or \
+                        relationship.lazy in ('dynamic', 'noload'):
+                    continue
+                path = parent_path + (key,)
+                plan.append((path, 'selectin'))
+                add_follow(relationship.mapper,
+                           (args or {}).get('follow', None),
+                           path)
+
+        add_follow(inspect(self.model),
+                   self._get_metadata().asdict_params.get('follow', None),
+                   ())
+        return plan
+
+    def _get_eager_load_options(self, fields=None):
+        """Get loader options for the eager load plan
+
+        The options are created once per set of fields. If `fields` is set
+        only relationships in `fields` are loaded.
+
+        :returns: Tuple of loader options
+        """
+        cache = self._get_metadata().eager_load_options
+        options = cache.get(fields)
+        if options is not None:
+            return options
+        options = []
+        for (path, strategy) in self._get_eager_load_plan():
+            if fields and path[0] not in fields:
+                continue
+            if strategy not in _EAGER_LOADERS:
+                raise Exception("Unknown eager load strategy %r" % strategy)
+            # The strategy is only set for the last relationship, the ones
+            # before it keep the strategy from their own entry in the plan
+            mapper = inspect(self.model)
+            option = None
+            for (i, key) in enumerate(path):
+                attribute = getattr(mapper.class_, key)
+                loader = (_EAGER_LOADERS[strategy] if i == len(path) - 1
+                          else defaultload)
+                if option is None:
+                    option = loader(attribute)
+                else:
+                    option = getattr(option, loader.__name__)(attribute)
+                mapper = mapper.relationships[key].mapper
+            options.append(option)
+        options = tuple(options)
+        if len(cache) < 256:
+            cache[fields] = options
+        return options
+
+    def _apply_eager_load(self, query, fields=None):
+        """Add the eager load options to a query
+
+        :returns: The query
+        """
+        options = self._get_eager_load_options(fields)
+        return query.options(*options) if options else query
+
+    def _check_lazy_loads(self, items, fields=None):
+        """Log a warning if followed relationships will be lazy loaded
+
+        Only done if the app is in debug mode. Only relationships followed
+        directly from the items are checked.
+        """
+        if not current_app.debug or not items:
+            return
+        if fields:
+            follow = self._get_fields_asdict_params(fields)['follow']
+        else:
+            follow = self._get_metadata().asdict_params.get('follow', None)
+        relationships = inspect(self.model).relationships
+        keys = [k for k in dictalchemy.utils.arg_to_dict(follow)
+                if k in relationships and
+                relationships[k].lazy not in ('dynamic', 'noload')]
+        unloaded = set()
+        for item in items:
+            unloaded.update(set(keys) & inspect(item).unloaded)
+        if unloaded:
+            _logger.warning('%s: The relationships %s will be lazy loaded '
+                            'for each of %d items, add them to eager_load' %
+                            (self.__class__.__name__,
+                             ', '.join(sorted(unloaded)),
+                             len(items)))
+
+    def _stream_json_response(self, items, data, fields=None):
+        """Get a streamed json response
+
+        The response is a json object where 'items' contains the items
+        serialized one at a time, followed by the keys in `data`.
+
+        :param items: Iterable of items
+        :param data: Dict of other values in the response
+        :param fields: Fields to return, see :meth:`AlchemyView._asdict`
+        """
+        def generate():
+            yield u'{"items": ['
+            for (i, item) in enumerate(items):
+                if i:
+                    yield u', '
+                yield self._json_dumps(self._asdict(item, fields))
+            yield u']'
+            for (k, v) in data.items():
+                yield u', %s: %s' % (self._json_dumps(k), self._json_dumps(v))
+            yield u'}'
+
+        return Response(stream_with_context(_chunked(generate())),
+                        mimetype='application/json')
+
+    def _base_query(self):
+        """Get the base query that should be used
+
+        For example add joins here. Default implementation returns
+        `self._get_session().query(self.model)`.
+
+        :returns: Sqlalchemy query
+        """
+        return self._get_session().query(self.model)
+
+    @classmethod
+    def register(cls, app, *args, **kwargs):
+        """Register the view
+
+        Compiles the view metadata with
+        :meth:`AlchemyView._compile_metadata` before the routes are
+        registered. See :meth:`flask_classy.FlaskView.register`.
+
+        :raises: Exception if the view uses options that can't be combined
+        """
+        cls._check_shard_options()
+        cls._metadata = cls._compile_metadata()
+        return super(AlchemyView, cls).register(app, *args, **kwargs)
+
+    @classmethod
+    def _check_shard_options(cls):
+        """Check that a sharded view doesn't use cursor pagination
+
+        :raises: Exception if :attr:`AlchemyView.shards` is set together \
+                with :attr:`AlchemyView.cursor_pagination` or with a column \
+                name in :attr:`AlchemyView.sortby_map`
+        """
+        if not cls.shards:
+            return
+        if cls.cursor_pagination:
+            raise Exception("Cursor pagination is not supported on sharded "
+                            "views")
+        for (key, value) in (cls.sortby_map or {}).items():
+            if isinstance(value, basestring):
+                raise Exception("sortby_map['%s'] must be a column on "
+                                "sharded views" % key)
+
+    @classmethod
+    def _get_shard_pool(cls):
+        """Get the thread pool used to query the shards
+
+        The pool is created on first use, with one thread per shard, and is
+        shared by all requests to the view class.
+
+        :returns: A :class:`multiprocessing.pool.ThreadPool`
+        """
+        with _shard_pools_lock:
+            (size, pool) = _shard_pools.get(cls, (None, None))
+            if size != len(cls.shards):
+                if pool is not None:
+                    pool.close()
+                pool = ThreadPool(len(cls.shards))
+                _shard_pools[cls] = (len(cls.shards), pool)
+            return pool
+
+    @classmethod
+    def _compile_metadata(cls):
+        """Compile the model metadata for this view
+
+        :returns: :data:`_ViewMetadata`
+        """
+        mapper = inspect(cls.model)
+        primary_key = []
+        for column in mapper.primary_key:
+            key = mapper.get_property_by_column(column).key
+            try:
+                python_type = column.type.python_type
+            except NotImplementedError:
+                python_type = None
+            primary_key.append(_PrimaryKeyColumn(key,
+                                                 getattr(cls.model, key),
+                                                 python_type,
+                                                 _make_coercer(python_type)))
+        if cls.asdict_params is not None:
+            asdict_params = dict(cls.asdict_params)
+        else:
+            asdict_params = dict(cls.dict_params or {})
+        if cls.fromdict_params is not None:
+            fromdict_params = dict(cls.fromdict_params)
+        else:
+            fromdict_params = dict(cls.dict_params or {})
+        return _ViewMetadata(cls.model,
+                             tuple(primary_key),
+                             cls.build_route_name('get'),
+                             asdict_params,
+                             fromdict_params,
+                             _AsdictSerializer(asdict_params),
+                             {},
+                             {},
+                             {})
+
+    @classmethod
+    def _get_metadata(cls):
+        """Get the model metadata for this view
+
+        The metadata is compiled when the view is registered, or on first use
+        if the view hasn't been registered.
+
+        :returns: :data:`_ViewMetadata`
+        """
+        metadata = cls.__dict__.get('_metadata')
+        if metadata is None or metadata.model is not cls.model:
+            metadata = cls._metadata = cls._compile_metadata()
+        return metadata
+
+    def _item_url(self, item):
+        """Get the url to read an item
+
+        The id of an item with a composite primary key is the primary key
+        values joined with ','.
+        """
+        return self._primary_key_url([getattr(item, column.key) for column
+                                      in self._get_metadata().primary_key])
+
+    def _primary_key_url(self, values):
+        """Get the url to read the item with primary key `values`
+
+        :param values: List of primary key values
+        """
+        metadata = self._get_metadata()
+        if len(values) == 1:
+            id = values[0]
+        else:
+            id = u','.join(unicode(value) for value in values)
+        return url_for(metadata.get_route_name, id=id)
+
+    def _get_item(self, id, fields=None):
+        """Get item based on id
+
+        Can handle models with int and string primary keys. Ids for composite
+        primary keys are the values joined with ',', see
+        :meth:`AlchemyView._item_url`.
+
+        If `fields` is set only those columns will be loaded, see
+        :meth:`AlchemyView._get_fields`.
+
+        :raises: Exception if the primary key is not int or string
+
+        :returns: An item, calls flask.abort(404) if the item isn't found
+        """
+        primary_key = self._get_metadata().primary_key
+        values = self._parse_id(id)
+        params = dict(('pk_%d' % i, value) for (i, value) in enumerate(values))
+
+        if self.identity_map_lookup and not self._base_query_is_overridden():
+            item = self._get_item_from_identity_map(values)
+            if item is not None:
+                return item
+
+        if self._can_cache_item_statement():
+            item = self._get_item_query(fields).params(**params).first()
+        else:
+            item = self._apply_fields(self._base_query(), fields).filter(
+                *[column.attribute == params['pk_%d' % i]
+                  for (i, column) in enumerate(primary_key)]).\
+                limit(1).first()
+
+        if not item:
+            abort(404)
+
+        return item
+
+    def _parse_id(self, id):
+        """Convert an id from an url to primary key values
+
+        :raises: Exception if the primary key is not int or string
+
+        :returns: List of primary key values, calls flask.abort(404) if the \
+                id is invalid
+        """
+        primary_key = self._get_metadata().primary_key
+        if len(primary_key) == 1:
+            values = [id]
+        else:
+            values = unicode(id).split(u',')
+            if len(values) != len(primary_key):
+                abort(404)
+
+        for (i, (column, value)) in enumerate(zip(primary_key, values)):
+            if column.coerce is None:
+                raise Exception("AlchemyView can only handle int and string "
+                                "primary keys not %r" % column.python_type)
+            try:
+                values[i] = column.coerce(value)
+            except:
+                abort(404)
+        return values
+
+    def _base_query_is_overridden(self):
+        """Check if :meth:`AlchemyView._base_query` is overridden
+
+        :returns: bool
+        """
+        return self._is_overridden('_base_query')
+
+    def _is_overridden(self, name):
+        """Check if the method `name` is overridden in a subclass
+
+        :returns: bool
+        """
+        method = getattr(type(self), name)
+        default = getattr(AlchemyView, name)
+        return (getattr(method, '__func__', method) is not
+                getattr(default, '__func__', default))
+
+    def _can_cache_item_statement(self):
+        """Check if the statement used by :meth:`AlchemyView._get_item` can
+        be cached
+
+        :returns: bool
+        """
+        if not self.cache_item_statement:
+            return False
+        return self.static_base_query or not self._base_query_is_overridden()
+
+    def _get_item_from_identity_map(self, values):
+        """Get an item from the session identity map
+
+        Expired items and items that are deleted will not be returned.
+
+        :param values: Primary key values
+
+        :returns: An item or None if it isn't loaded in the session
+        """
+        session = self._get_session()
+        key = inspect(self.model).identity_key_from_primary_key(values)
+        item = session.identity_map.get(key)
+        if item is not None:
+            state = inspect(item)
+            if (state.expired or state.expired_attributes or state.deleted or
+                    state.was_deleted or item in session.deleted):
+                item = None
+        _identity_map_stats[self.__class__]['hits' if item is not None
+                                            else 'misses'] += 1
+        return item
+
+    @classmethod
+    def _get_identity_map_stats(cls):
+        """Get identity map lookup stats for this view
+
+        :returns: Dict with 'hits', 'misses' and 'hit_rate', hit_rate is \
+                None if no lookups has been made
+        """
+        stats = _identity_map_stats[cls]
+        lookups = stats['hits'] + stats['misses']
+        return {'hits': stats['hits'],
+                'misses': stats['misses'],
+                'hit_rate': stats['hits'] / lookups if lookups else None}
+
+    def _get_item_query(self, fields=None):
+        """Get the cached item query used by :meth:`AlchemyView._get_item`
+
+        The query is built from :meth:`AlchemyView._base_query` once per view
+        class and set of fields, and filters the primary key columns with the
+        bind parameters 'pk_0', 'pk_1', ...
+
+        :returns: :class:`sqlalchemy.ext.baked.Result`
+        """
+        primary_key = self._get_metadata().primary_key
+        query = _bakery(lambda session: self._base_query(),
+                        self.__class__,
+                        self.model)
+        query += lambda q: q.filter(*[column.attribute ==
+                                      bindparam('pk_%d' % i)
+                                      for (i, column)
+                                      in enumerate(primary_key)])
+        columns = self._get_fields_columns(fields) if fields else ()
+        if columns:
+            query.add_criteria(lambda q: q.options(load_only(*columns)),
+                               columns)
+        session = self._get_session()
+        if isinstance(session, scoped_session):
+            session = session()
+        return query(session)
+
+    def _get_session(self):
+        """Get SQLAlchemy session
+
+        If :attr:`AlchemyView.shards` is set the session of the current
+        shard is returned, see :meth:`AlchemyView._get_shard_session`. If
+        :attr:`AlchemyView.read_sessions` is set GET and HEAD requests get a
+        read session, see :meth:`AlchemyView._get_read_session`.
+
+        :raises: An exception if self.session isn't set and \
+                Flask-SQLAlchemy isn't used
+
+        :returns: SQLAlchemy session
+        """
+        if self.shards and has_request_context():
+            return self._get_shard_session()
+        if self.read_sessions and has_request_context():
+            if request.method in ('GET', 'HEAD'):
+                if not self._in_read_your_writes_window():
+                    return self._get_read_session()
+            else:
+                self._track_write()
+        return self.session or current_app.extensions['sqlalchemy'].db.session
+
+    def _get_shard_session(self):
+        """Get the session of the current shard
+
+        The shard is the one selected with :meth:`AlchemyView._set_shard`,
+        or for requests with an id in the URL the shard of that id.
+
+        :raises: Exception if no shard can be chosen
+
+        :returns: A session from :attr:`AlchemyView.shards`
+        """
+        shards = request.environ.setdefault('flask_alchemyview.shards', {})
+        shard = shards.get(self.__class__)
+        if shard is None:
+            if 'id' not in (request.view_args or {}):
+                raise Exception("No shard is selected")
+            shard = shards[self.__class__] = self._shard_for_primary_key(
+                self._parse_id(request.view_args['id']))
+        return self.shards[shard]
+
+    def _set_shard(self, shard):
+        """Select the shard used by this view for the rest of the request
+
+        :param shard: A key in :attr:`AlchemyView.shards` or None
+        """
+        request.environ.setdefault('flask_alchemyview.shards',
+                                   {})[self.__class__] = shard
+
+    def _shard_for_primary_key(self, values):
+        """Get the shard of the item with primary key `values`
+
+        :returns: A key in :attr:`AlchemyView.shards`
+        """
+        primary_key = dict((column.key, value) for (column, value)
+                           in zip(self._get_metadata().primary_key, values))
+        return self.shard_resolver.shard_for_primary_key(primary_key,
+                                                         sorted(self.shards))
+
+    def _get_read_session(self):
+        """Get the read session for this request
+
+        The session is chosen once per request and view, so all queries in a
+        request use the same replica.
 
-    The parameters will be used in :meth:`dictalchemy.utils.asdict`.
-    """
+        :returns: A session from :attr:`AlchemyView.read_sessions`
+        """
+        sessions = request.environ.setdefault(
+            'flask_alchemyview.read_sessions', {})
+        session = sessions.get(self.__class__)
+        if session is None:
+            session = sessions[self.__class__] = self._choose_read_session()
+        return session
 
-    fromdict_params = None
-    """Parameters that will be used when updating an item
+    def _choose_read_session(self):
+        """Choose a session with :attr:`AlchemyView.read_session_strategy`
 
-    The parameters will be used in :meth:`dictalchemy.utils.fromdict`.
-    """
+        Sessions with the same number of checked out connections are chosen
+        round-robin.
 
-    max_page_limit = 50
-    """Max page limit"""
+        :raises: Exception if the strategy is unknown
 
-    page_limit = 10
-    """Default page limit"""
+        :returns: A session from :attr:`AlchemyView.read_sessions`
+        """
+        sessions = list(self.read_sessions)
+        start = next(_read_session_counters[self.__class__]) % len(sessions)
+        sessions = sessions[start:] + sessions[:start]
+        if self.read_session_strategy == 'round_robin':
+            return sessions[0]
+        elif self.read_session_strategy == 'least_connections':
+            mapper = inspect(self.model)
+
+            def checked_out(session):
+                try:
+                    return session.get_bind(mapper).pool.checkedout()
+                except Exception:
+                    return 0
 
-    sortby = None
-    """Default sortby column
+            return min(sessions, key=checked_out)
+        raise Exception("Unknown read session strategy %r" %
+                        self.read_session_strategy)
 
-    If not set no sortby will be applied by default in
-    :func:`AlchemyView.index`.
+    def _in_read_your_writes_window(self):
+        """Check if the client wrote within
+        :attr:`AlchemyView.read_your_writes_window` seconds
 
-    In order for sortby to have any effect it also needs to be set in
-    :attr:`AlchemyView.sortby_map`
-    """
+        :returns: bool
+        """
+        if not self.read_your_writes_window:
+            return False
+        try:
+            last_write = float(request.cookies.get(
+                self.read_your_writes_cookie, ''))
+        except ValueError:
+            return False
+        return time.time() - last_write < self.read_your_writes_window
 
-    sort_direction = 'asc'
-    """Default sort direction"""
+    def _track_write(self):
+        """Set the read-your-writes cookie if the request succeeds
 
-    sortby_map = None
-    """Map of string=>column for sortby
+        See :attr:`AlchemyView.read_your_writes_window`.
+        """
+        if not self.read_your_writes_window or \
+                request.environ.get('flask_alchemyview.write_tracked'):
+            return
+        request.environ['flask_alchemyview.write_tracked'] = True
+        cookie = self.read_your_writes_cookie
+        max_age = int(math.ceil(self.read_your_writes_window))
+
+        @after_this_request
+        def set_cookie(response):
+            if response.status_code < 400:
+                response.set_cookie(cookie, repr(time.time()),
+                                    max_age=max_age)
+            return response
+
+    def _count(self, query):
+        """Count the rows of a query using
+        :attr:`AlchemyView.count_strategy`
+
+        The count type is one of 'exact', 'none', 'capped' (there are at least
+        `count` rows), 'cached' (exact but possibly stale) and 'estimated'.
+
+        :raises: Exception if the count strategy is unknown
+
+        :returns: Tuple (count, count type)
+        """
+        strategy = self.count_strategy
+        if strategy in ('exact', 'window'):
+            return query.count(), 'exact'
+        elif strategy == 'none':
+            return None, 'none'
+        elif strategy == 'capped':
+            count = query.limit(self.count_cap + 1).count()
+            if count > self.count_cap:
+                return self.count_cap, 'capped'
+            return count, 'exact'
+        elif strategy == 'cached':
+            compiled = query.statement.compile()
+            key = (self.__class__,
+                   unicode(query.session.get_bind(self.model).url),
+                   unicode(compiled),
+                   repr(sorted(compiled.params.items())))
+            now = time.time()
+            cached = _count_cache.get(key)
+            if cached and cached[0] > now:
+                return cached[1], 'cached'
+            count = query.count()
+            if len(_count_cache) >= _COUNT_CACHE_MAX_SIZE:
+                for k, v in list(_count_cache.items()):
+                    if v[0] <= now:
+                        _count_cache.pop(k, None)
+                if len(_count_cache) >= _COUNT_CACHE_MAX_SIZE:
+                    _count_cache.clear()
+            _count_cache[key] = (now + self.count_cache_ttl, count)
+            return count, 'exact'
+        elif strategy == 'estimated':
+            try:
+                count = self._estimate_count(query)
+            except Exception, e:
+                _logger.debug('Count estimate failed: %r' % e)
+                count = None
+            if count is None:
+                return query.count(), 'exact'
+            return count, 'estimated'
+        else:
+            raise Exception("Unknown count strategy %r" % strategy)
 
-    The values can be anything that will work together with the query returned
-    by :meth:`AlchemyView._base_query`. So if there is a join
-    in the base query that column, or name of that colum can be mapped to a key
-    in the sortby_map.
-    """
+    def _supports_window_count(self, query):
+        """Check if the database supports `count(*) OVER ()`
 
-    template_suffixes = {'text/html': 'jinja2'}
-    """Suffixes for response types, currently 'text/html' is the only one
-    supported"""
+        :returns: bool
+        """
+        dialect = query.session.get_bind(self.model).dialect
+        if dialect.name == 'sqlite':
+            return dialect.dbapi.sqlite_version_info >= (3, 25, 0)
+        elif dialect.name == 'mysql':
+            version = dialect.server_version_info or ()
+            if getattr(dialect, '_is_mariadb', False):
+                return version >= (10, 2)
+            return version >= (8, 0)
+        return dialect.name in ('postgresql', 'oracle', 'mssql')
+
+    def _estimate_count(self, query):
+        """Get the query planner estimate of the number of rows in a query
+
+        Only PostgreSQL is supported, the estimate is the 'Plan Rows' of
+        `EXPLAIN (FORMAT JSON)`.
+
+        :returns: Estimated count or None if the dialect isn't supported
+        """
+        connection = query.session.connection()
+        dialect = connection.dialect
+        if dialect.name != 'postgresql':
+            return None
+        compiled = query.statement.compile(dialect=dialect)
+        params = compiled.construct_params()
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        plan = connection.execute('EXPLAIN (FORMAT JSON) %s' % compiled,
+                                  params).scalar()
+        if isinstance(plan, basestring):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def _cache_key(self, *parts):
+        """Get a response cache key
+
+        Override this to add for example the current user to the keys.
+
+        :param parts: Strings that identifies the response
+
+        :returns: String
+        """
+        return u':'.join((u'alchemyview',
+                          u'%s.%s' % (self.__class__.__module__,
+                                      self.__class__.__name__)) + parts)
 
-    def _json_dumps(self, obj, ensure_ascii=False, **kwargs):
-        """Load object from json string
+    def _item_cache_key(self, values, mimetype, fields=None):
+        """Get the response cache key for an item
 
-        Uses :attr:`AlchemyView.JSONEncoder` to dump the
-        data.
+        Keys for responses with `fields` contain the index generation, so
+        they are invalidated by any write to the view.
 
-        :param obj: Object that should be dumped
+        :param values: Primary key values
+        :param mimetype: Response variant, see \
+                :meth:`AlchemyView._cache_variant`
+        :param fields: Tuple of fields, see :meth:`AlchemyView._get_fields`
 
-        :returns: JSON string
+        :returns: String
         """
-        kwargs['ensure_ascii'] = ensure_ascii
-        kwargs['cls'] = self.JSONEncoder
-        return json.dumps(obj, **kwargs)
+        id = u','.join(unicode(v) for v in values)
+        if fields:
+            return self._cache_key(u'get', id, self._get_index_generation(),
+                                   u','.join(fields), mimetype)
+        return self._cache_key(u'get', id, mimetype)
 
-    def _json_loads(self, string, **kwargs):
-        """Load json"""
-        return json.loads(string, **kwargs)
+    def _index_cache_key(self, args, mimetype):
+        """Get the response cache key for an index response
 
-    def _json_response(self, obj, status=200):
-        """Get a json response
+        The key contains the index generation, which is changed by
+        :meth:`AlchemyView._invalidate_cache`.
 
-        :param obj: Exception OR something that can used by
-            :meth:`AlchemyView._json_dumps`
-            If this is an exception the status will be
-            set to 400 if status is less than 400.
-        """
-        if isinstance(obj, Exception):
-            if status < 400:
-                status = 400
-            obj = _exception_to_dict(obj)
+        :param args: Dict of normalized index arguments
+        :param mimetype: Response variant, see \
+                :meth:`AlchemyView._cache_variant`
 
-        return Response(self._json_dumps(obj),
-                        status=status,
-                        mimetype='application/json')
+        :returns: String
+        """
+        digest = hashlib.sha1(
+            repr(sorted(args.items())).encode('utf-8')).hexdigest()
+        return self._cache_key(u'index', self._get_index_generation(),
+                               unicode(digest), mimetype)
 
-    def _base_query(self):
-        """Get the base query that should be used
+    def _get_index_generation(self):
+        """Get the index generation from the response cache
 
-        For example add joins here. Default implementation returns
-        `self._get_session().query(self.model)`.
+        The generation is a random token that is replaced by
+        :meth:`AlchemyView._invalidate_cache`.
 
-        :returns: Sqlalchemy query
+        :returns: String
         """
-        return self._get_session().query(self.model)
+        generation_key = self._cache_key(u'index-generation')
+        generation = self.response_cache.get(generation_key)
+        if generation is None:
+            generation = unicode(uuid.uuid4().hex)
+            self.response_cache.set(generation_key, generation)
+        return generation
 
-    def _item_url(self, item):
-        """Get the url to read an item
+    def _cache_mimetypes(self):
+        """Get all mimetypes responses can be cached for
 
-        :raises: Exception if the items primary key is a composite key
+        :returns: List of mimetypes
         """
-        if len(self.model.__table__.primary_key) != 1:
-            raise Exception("AlchemyView doesn't handle models with "
-                            "composite primary key")
-        primary_key = [(column.name, column.type.python_type)
-                       for column in self.model.__table__.primary_key]
-        primary_key_name = primary_key[0][0]
-        return url_for(self.build_route_name('get'),
-                       id=getattr(item, primary_key_name))
+        return list(self._get_encoders()) + list(self.template_suffixes)
 
-    def _get_item(self, id):
-        """Get item based on id
+    def _cache_variant(self, mimetype, encoding=None):
+        """Get the response variant used in cache keys
+
+        :param mimetype: Response mimetype
+        :param encoding: Content encoding, see \
+                :meth:`AlchemyView._get_content_encoding`
 
-        Can handle models with int and string primary keys.
+        :returns: String
+        """
+        if encoding is None:
+            return mimetype
+        return u'%s;%s' % (mimetype, encoding)
 
-        :raises: Exception if the primary key is a composite or not \
-                int or string
+    def _cache_variants(self):
+        """Get all response variants that can be cached
 
-        :returns: An item, calls flask.abort(400) if the item isn't found
+        :returns: List of strings, see :meth:`AlchemyView._cache_variant`
         """
-        primary_key = [(column.name, column.type.python_type)
-                       for column in self.model.__table__.primary_key]
-        if len(primary_key) != 1:
-            raise Exception("AlchemyView doesn't handle models with "
-                            "composite primary key")
-        primary_key_type = primary_key[0][1]
-        primary_key_name = primary_key[0][0]
-        if primary_key_type not in (int, str, unicode):
-            raise Exception("AlchemyView can only handle int and string "
-                            "primary keys not %r" % primary_key_type)
-        try:
-            if type(id) != primary_key_type:
-                id = primary_key_type(id)
-        except:
-            abort(404)
+        encodings = [None]
+        if self.compress_responses:
+            encodings.append('gzip')
+            if brotli is not None:
+                encodings.append('br')
+        return [self._cache_variant(mimetype, encoding)
+                for mimetype in self._cache_mimetypes()
+                for encoding in encodings]
+
+    def _get_cached_response(self, key):
+        """Get a response from :attr:`AlchemyView.response_cache`
+
+        :returns: :class:`flask.Response` or None
+        """
+        if key is None:
+            return None
+        cached = self.response_cache.get(key)
+        if cached is None:
+            return None
+        (status, mimetype, body, headers) = cached
+        return Response(body, status=status, mimetype=mimetype,
+                        headers=list(headers))
 
-        item = self._base_query().filter(
-            getattr(self.model,
-                    primary_key_name) == id).limit(1).first()
+    def _cache_response(self, key, response):
+        """Store a response in :attr:`AlchemyView.response_cache`
 
-        if not item:
-            abort(404)
+        Only responses with status 200 that aren't streamed are cached.
 
-        return item
+        :returns: The response, converted to a :class:`flask.Response`
+        """
+        if key is None:
+            return response
+        if not isinstance(response, Response):
+            response = Response(response, mimetype='text/html')
+        if response.status_code == 200 and not response.is_streamed:
+            self.response_cache.set(key, (response.status_code,
+                                          response.mimetype,
+                                          response.get_data(),
+                                          tuple((k, v) for (k, v)
+                                                in response.headers
+                                                if k in _CACHED_HEADERS)))
+        return response
+
+    def _item_etag(self, item, mimetype, fields=None):
+        """Get the ETag for an item from :attr:`AlchemyView.version_column`
+
+        The content encoding is part of the hash, so compressed and
+        uncompressed responses have different ETags.
+
+        :returns: String or None if no version column is set
+        """
+        if not self.version_column:
+            return None
+        return hashlib.sha1(
+            (u'%s:%s:%s:%s' % (getattr(item, self.version_column),
+                               mimetype,
+                               u','.join(fields or ()),
+                               self._get_content_encoding() or u'')).
+            encode('utf-8')).hexdigest()
+
+    def _add_validators(self, response, etag=None, last_modified=None):
+        """Add ETag and Last-Modified headers to a response
+
+        Only used if :attr:`AlchemyView.conditional_responses` is set. If
+        `etag` isn't set a hash of the body will be used.
+
+        :returns: The response, converted to a :class:`flask.Response`
+        """
+        if not self.conditional_responses:
+            return response
+        if not isinstance(response, Response):
+            response = Response(response, mimetype='text/html')
+        if response.status_code != 200 or response.is_streamed:
+            return response
+        if etag is not None:
+            response.set_etag(etag)
+        elif response.get_etag()[0] is None:
+            response.add_etag()
+        if last_modified is not None:
+            response.last_modified = last_modified
+        return response
+
+    def _not_modified(self, etag=None, last_modified=None):
+        """Check if the request is conditional and the resource is unchanged
+
+        :returns: bool
+        """
+        if not self.conditional_responses or (etag is None and
+                                              last_modified is None):
+            return False
+        return not is_resource_modified(request.environ,
+                                        etag=etag,
+                                        last_modified=last_modified)
 
-    def _get_session(self):
-        """Get SQLAlchemy session
+    def _not_modified_response(self, etag=None, last_modified=None):
+        """Get a 304 response
 
-        :raises: An exception if self.session isn't set and \
-                Flask-SQLAlchemy isn't used
+        :returns: :class:`flask.Response`
+        """
+        response = Response(status=304)
+        if etag is not None:
+            response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        return response
 
-        :returns: SQLAlchemy session
+    def _make_conditional(self, response):
+        """Replace a response with a 304 if the request is conditional and
+        the response validators match
+
+        :returns: A response
         """
-        return self.session or current_app.extensions['sqlalchemy'].db.session
+        if not isinstance(response, Response) or \
+                response.status_code != 200:
+            return response
+        etag = response.get_etag()[0]
+        last_modified = response.last_modified
+        if self._not_modified(etag, last_modified):
+            return self._not_modified_response(etag, last_modified)
+        return response
+
+    def _invalidate_cache(self, item=None, primary_keys=()):
+        """Invalidate cached responses after a write
+
+        All index responses are invalidated, and all responses for `item` if
+        it's set.
+
+        :param primary_keys: List of primary key values for other items \
+                that should be invalidated
+        """
+        if self.response_cache is None:
+            return
+        primary_keys = list(primary_keys)
+        if item is not None:
+            primary_key = self._get_metadata().primary_key
+            primary_keys.append([getattr(item, column.key)
+                                 for column in primary_key])
+        keys = [self._item_cache_key(values, variant)
+                for values in primary_keys
+                for variant in self._cache_variants()]
+        if keys:
+            self.response_cache.delete(*keys)
+        self.response_cache.delete(self._cache_key(u'index-generation'))
 
     def _get_schema(self, data):
         """Get basic colander schema
@@ -377,17 +2537,62 @@ class AlchemyView(FlaskView):
         else:
             return self._get_schema(data)
 
+    def _get_validator(self, kind, data):
+        """Get a function that validates data
+
+        If the schema doesn't depend on the data, that is if neither
+        :meth:`AlchemyView._get_schema` or the method for `kind` is
+        overridden, the schema is created and compiled with
+        :func:`_compile_validator` once per view and schema class.
+
+        :param kind: 'create' or 'update'
+        :param data: The data that will be validated
+
+        :returns: A function that takes the data and returns the validated \
+                data with nulls removed
+        """
+        schema_class = getattr(self, '%s_schema' % kind, None)
+        if not self._is_overridden('_get_%s_schema' % kind) and \
+                (schema_class or not self._is_overridden('_get_schema')):
+            schema_class = schema_class or self.schema
+            validators = self._get_metadata().validators
+            validator = validators.get(schema_class)
+            if validator is None:
+                validator = validators[schema_class] = \
+                    _compile_validator(schema_class())
+            return validator
+        schema = getattr(self, '_get_%s_schema' % kind)(data)
+        return lambda data: _remove_colander_null(schema.deserialize(data))
+
+    def _deserialize(self, kind, data):
+        """Validate data with the create or update schema
+
+        Colander null values are removed, see :func:`_remove_colander_null`.
+
+        :param kind: 'create' or 'update'
+
+        :raises: :class:`colander.Invalid` if the data is invalid
+
+        :returns: The validated data
+        """
+        return self._get_validator(kind, data)(data)
+
     def _get_response_mimetype(self):
         """Get response type from response
 
-        :returns: 'application/json' or 'text/html'
+        A machine readable mimetype is only used if the client prefers it to
+        'text/html'.
+
+        :returns: 'application/json', a mimetype in \
+                :attr:`AlchemyView.encoders` or 'text/html'
         """
-        best = request.accept_mimetypes.best_match(['application/json',
-                                                    'text/html'])
-        if best == 'application/json' and \
+        mimetypes = ['application/json'] + \
+            sorted(m for m in self._get_encoders() if m != 'application/json')
+        best = request.accept_mimetypes.best_match(mimetypes + ['text/html'])
+        if best in mimetypes and \
                 request.accept_mimetypes[best] > \
                 request.accept_mimetypes['text/html']:
-            return 'application/json'
+            return best
         else:
             return 'text/html'
 
@@ -410,14 +2615,18 @@ class AlchemyView(FlaskView):
         '_TEMPLATE_template_vars' is set that method will be called and the
         returnvalue will be added to the template parameters.
 
+        The response is compressed if :attr:`AlchemyView.compress_responses`
+        is set, see :meth:`AlchemyView._compress`.
+
         :raises: If status is beteen 400 and 500 OR data is an exception a \
                 :class:`BadRequest` will be raised.
 
         :returns: A json or html response, based on the request accept headers
         """
         mimetype = self._get_response_mimetype()
-        if mimetype == 'application/json':
-            return self._json_response(data, status)
+        if mimetype in self._get_encoders():
+            return self._compress(self._encoded_response(data, mimetype,
+                                                         status))
         else:
             if isinstance(data, Exception):
                 if status < 400:
@@ -432,20 +2641,44 @@ class AlchemyView(FlaskView):
                 else:
                     kwargs = {}
                 try:
-                    return render_template(self._get_template_name(template,
-                                                                   mimetype),
-                                           data=data,
-                                           **kwargs)
+                    return self._compress(render_template(
+                        self._get_template_name(template, mimetype),
+                        data=data,
+                        **kwargs))
                 except TemplateNotFound:
                     raise BadRequest(406, {'message':
                                            _('Not a valid Accept-Header')})
 
     def get(self, id):
         """Handles GET requests"""
-        return self._response(self._get_item(id).
-                              asdict(**(getattr(self, 'asdict_params',
-                                                self.dict_params or None)
-                                        or {})), 'get')
+        try:
+            fields = self._get_fields()
+        except ValueError:
+            return self._response({u'message': _(u'Invalid fields')},
+                                  'get',
+                                  400)
+        mimetype = self._get_response_mimetype()
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self._item_cache_key(
+                self._parse_id(id),
+                self._cache_variant(mimetype, self._get_content_encoding()),
+                fields)
+            response = self._get_cached_response(cache_key)
+            if response is not None:
+                return self._make_conditional(response)
+
+        item = self._get_item(id, fields) if fields else self._get_item(id)
+        etag = self._item_etag(item, mimetype, fields)
+        last_modified = (getattr(item, self.last_modified_column)
+                         if self.last_modified_column else None)
+        if self._not_modified(etag, last_modified):
+            return self._not_modified_response(etag, last_modified)
+
+        response = self._response(self._asdict(item, fields), 'get')
+        response = self._add_validators(response, etag, last_modified)
+        return self._make_conditional(self._cache_response(cache_key,
+                                                           response))
 
     def post(self):
         """Handles POST
@@ -460,18 +2693,34 @@ class AlchemyView(FlaskView):
         If any error except validation errors are encountered a 500 will be
         returned.
 
+        If :attr:`AlchemyView.bulk_create` is set and the data is a list
+        :meth:`AlchemyView._bulk_post` is used.
+
+        If :attr:`AlchemyView.shards` is set the item is created in the shard
+        chosen by :meth:`ShardResolver.shard_for_data`.
+
         :returns: A response
         :rtype: :class:`flask.Response`
 
         """
-        session = self._get_session()
+        data = self._get_request_data()
+        if self.bulk_create and not self.shards and isinstance(data, list):
+            return self._bulk_post(data)
         try:
-            result = _remove_colander_null(self._get_create_schema(
-                request.json).deserialize(request.json))
+            result = self._deserialize('create', data)
         except Exception, e:
-            session.rollback()
+            if not self.shards:
+                self._get_session().rollback()
             return self._response(e, 'post', 400)
         else:
+            if self.shards:
+                try:
+                    self._set_shard(self.shard_resolver.shard_for_data(
+                        result, sorted(self.shards)))
+                except KeyError:
+                    return self._response(
+                        {u'message': _(u'Missing shard key')}, 'post', 400)
+            session = self._get_session()
             try:
                 item = self.model(**result)
                 session.add(item)
@@ -483,8 +2732,59 @@ class AlchemyView(FlaskView):
                     session.commit()
                 except Exception, e:
                     return self._response(e, 'post', 500)
+                self._invalidate_cache()
                 return redirect(self._item_url(item), 303)
 
+    def _validate_bulk(self, data, kind):
+        """Validate the items in a bulk request
+
+        :param data: List of items
+        :param kind: 'create' or 'update', see \
+                :meth:`AlchemyView._deserialize`
+
+        :returns: Tuple of (results, errors) where errors is a dict of \
+                index=>errors for the items that are invalid
+        """
+        results = []
+        errors = {}
+        for (index, item) in enumerate(data):
+            try:
+                results.append(self._deserialize(kind, item))
+            except colander.Invalid, e:
+                errors[unicode(index)] = e.asdict()
+        return (results, errors)
+
+    def _bulk_post(self, data):
+        """Create many items
+
+        All items are validated before anything is inserted. If any item is
+        invalid a 400 is returned with the errors for each invalid item keyed
+        by its index in the list, and nothing is created. Otherwise the items
+        are inserted with :meth:`sqlalchemy.orm.Session.bulk_insert_mappings`
+        in one transaction, so the model constructor isn't called.
+
+        :returns: A 201 response containing the number of created items
+        """
+        if len(data) > self.max_bulk_size:
+            return self._response({u'message': _(u'Too many items')},
+                                  'post',
+                                  400)
+        (results, errors) = self._validate_bulk(data, 'create')
+        if errors:
+            return self._response({u'message': _(u'Invalid Data'),
+                                   u'errors': errors},
+                                  'post',
+                                  400)
+        session = self._get_session()
+        try:
+            session.bulk_insert_mappings(self.model, results)
+            session.commit()
+        except Exception, e:
+            session.rollback()
+            return self._response(e, 'post', 500)
+        self._invalidate_cache()
+        return self._response({u'count': len(results)}, 'post', 201)
+
     def put(self, id):
         """Handles PUT
 
@@ -493,13 +2793,11 @@ class AlchemyView(FlaskView):
 
         """
         item = self._get_item(id)
+        data = self._get_request_data()
         session = self._get_session()
         try:
-            result = _remove_colander_null(self._get_update_schema(
-                request.json).deserialize(request.json))
-            item.fromdict(result,
-                          **(getattr(self, 'fromdict_params',
-                                     self.dict_params or None) or {}))
+            result = self._deserialize('update', data)
+            item.fromdict(result, **self._get_metadata().fromdict_params)
             session.add(item)
             session.commit()
         except colander.Invalid, e:
@@ -507,10 +2805,297 @@ class AlchemyView(FlaskView):
         except Exception, e:
             return self._response(e, 'put', 500)
         else:
+            self._invalidate_cache(item)
             return redirect(self._item_url(item), 303)
 
+    def _patch(self, id):
+        """Update an item with one UPDATE statement
+
+        The data is validated with :meth:`AlchemyView._get_update_schema` and
+        the column attributes in it are set with one UPDATE filtered by
+        :meth:`AlchemyView._base_query`, see :meth:`AlchemyView._write_query`,
+        without loading the item. A 404 is
+        returned if no row was updated. ORM events are not used. Only the
+        columns :meth:`dictalchemy.utils.fromdict` would set with
+        :attr:`AlchemyView.fromdict_params` are updated, see
+        :meth:`AlchemyView._get_fromdict_columns`.
+
+        PATCH isn't routed by default, add it to a view with::
+
+            patch = AlchemyView._patch
+
+        :returns: A response with an empty dict
+        """
+        values = self._parse_id(id)
+        data = self._get_request_data()
+        try:
+            result = self._deserialize('update', data)
+        except Exception, e:
+            return self._response(e, 'patch', 400)
+        columns = self._get_fromdict_columns()
+        changes = dict((getattr(self.model, k), v)
+                       for (k, v) in result.iteritems() if k in columns)
+        if not changes:
+            return self._response({u'message': _(u'Nothing to update')},
+                                  'patch',
+                                  400)
+        session = self._get_session()
+        criterion = self._primary_key_criteria([values])[0]
+        try:
+            count = self._write_query(criterion).update(
+                changes, synchronize_session=False)
+            if not count:
+                session.rollback()
+                abort(404)
+            session.commit()
+        except HTTPException:
+            raise
+        except Exception, e:
+            session.rollback()
+            return self._response(e, 'patch', 500)
+        self._invalidate_cache(primary_keys=[values])
+        return self._response({}, 'patch', 200)
+
+    def _get_fromdict_columns(self):
+        """Get the columns that fromdict() may set
+
+        Uses :attr:`AlchemyView.fromdict_params` and the dictalchemy options
+        on the model the same way as :meth:`dictalchemy.utils.fromdict`.
+        Primary keys are never included.
+
+        :returns: Set of column attribute names
+        """
+        params = self._get_metadata().fromdict_params
+        mapper = inspect(self.model)
+        columns = set(c.key for c in mapper.column_attrs)
+        if params.get('only'):
+            keys = set(params['only'])
+        else:
+            exclude = list(params.get('exclude') or [])
+            exclude += getattr(self.model, 'dictalchemy_exclude',
+                               dictalchemy_constants.default_exclude) or []
+            exclude_underscore = params.get('exclude_underscore')
+            if exclude_underscore is None:
+                exclude_underscore = getattr(
+                    self.model,
+                    'dictalchemy_exclude_underscore',
+                    dictalchemy_constants.default_exclude_underscore)
+            if exclude_underscore:
+                exclude += [k.key for k in mapper.attrs if k.key[0] == '_']
+            include = list(params.get('include') or []) + \
+                (getattr(self.model,
+                         'dictalchemy_fromdict_include',
+                         getattr(self.model, 'dictalchemy_include', None)) or
+                 [])
+            keys = (columns - set(exclude)) | set(include)
+        return (keys & columns) - set(column.key for column
+                                      in self._get_metadata().primary_key)
+
+    def _get_existing_primary_keys(self, primary_keys):
+        """Get the primary keys that exist in the base query
+
+        Runs one SELECT of the primary key columns per 500 values.
+
+        :param primary_keys: List of primary key values
+
+        :returns: Set of tuples of primary key values
+        """
+        attributes = [column.attribute for column
+                      in self._get_metadata().primary_key]
+        existing = set()
+        for criterion in self._primary_key_criteria(primary_keys):
+            query = self._base_query().with_entities(*attributes)
+            existing.update(tuple(row) for row in query.filter(criterion))
+        return existing
+
+    def _primary_key_criteria(self, primary_keys, chunk_size=500):
+        """Get criteria that matches a list of primary keys
+
+        The primary keys are split into chunks so that no criterion contains
+        more than `chunk_size` bind parameters.
+
+        :param primary_keys: List of primary key values
+
+        :returns: List of criteria
+        """
+        attributes = [column.attribute for column
+                      in self._get_metadata().primary_key]
+        chunk_size = max(1, chunk_size // len(attributes))
+        criteria = []
+        for start in range(0, len(primary_keys), chunk_size):
+            chunk = primary_keys[start:start + chunk_size]
+            if len(attributes) == 1:
+                criteria.append(attributes[0].in_([values[0]
+                                                   for values in chunk]))
+            else:
+                criteria.append(or_(*[and_(*[attribute == value
+                                             for (attribute, value)
+                                             in zip(attributes, values)])
+                                      for values in chunk]))
+        return criteria
+
+    def _write_query(self, criterion):
+        """Get a query for an UPDATE or DELETE of the rows in
+        :meth:`AlchemyView._base_query` that match `criterion`
+
+        :meth:`sqlalchemy.orm.query.Query.update` and
+        :meth:`sqlalchemy.orm.query.Query.delete` can't be used on a query
+        with joins, so if :meth:`AlchemyView._base_query` is overridden the
+        rows are matched by primary key in a subquery of the base query.
+
+        :returns: Query of :attr:`AlchemyView.model`
+        """
+        query = self._get_session().query(self.model)
+        if not self._base_query_is_overridden():
+            return query.filter(criterion)
+        attributes = [column.attribute for column
+                      in self._get_metadata().primary_key]
+        subquery = self._base_query().with_entities(
+            *[attribute.label('pk_%d' % i)
+              for (i, attribute) in enumerate(attributes)]).\
+            filter(criterion).subquery()
+        if len(attributes) == 1:
+            return query.filter(attributes[0].in_(select([subquery.c.pk_0])))
+        return query.filter(exists().where(and_(
+            *[attribute == subquery.c['pk_%d' % i]
+              for (i, attribute) in enumerate(attributes)])))
+
+    def _delete_primary_keys(self, primary_keys):
+        """Delete items without loading them
+
+        Runs one DELETE per chunk of primary keys, filtered by
+        :meth:`AlchemyView._base_query`, see
+        :meth:`AlchemyView._write_query`. Deleted items are removed from the
+        session. The session isn't committed.
+
+        :param primary_keys: List of primary key values
+
+        :returns: Number of deleted rows
+        """
+        session = self._get_session()
+        mapper = inspect(self.model)
+        count = 0
+        for criterion in self._primary_key_criteria(primary_keys):
+            count += self._write_query(criterion).delete(
+                synchronize_session=False)
+        for values in primary_keys:
+            item = session.identity_map.get(
+                mapper.identity_key_from_primary_key(values))
+            if item is not None:
+                session.expunge(item)
+        return count
+
+    @route('/', methods=['PUT', 'PATCH'])
+    def update_many(self):
+        """Handles PUT and PATCH to the listing URL
+
+        Returns a 405 unless :attr:`AlchemyView.bulk_update` is set.
+
+        The data is a list of items where every item contains 'id' and the
+        values to update. The values are validated with
+        :meth:`AlchemyView._get_update_schema`. If an item is invalid or not
+        found in :meth:`AlchemyView._base_query` a 400 is returned with the
+        errors keyed by the index of the item and nothing is updated.
+        Otherwise all items are updated with
+        :meth:`sqlalchemy.orm.Session.bulk_update_mappings` in one
+        transaction. Only the columns :meth:`dictalchemy.utils.fromdict`
+        would set with :attr:`AlchemyView.fromdict_params` are updated, see
+        :meth:`AlchemyView._get_fromdict_columns`. Relationships are not
+        updated.
+
+        :returns: A response containing the number of updated items and a \
+                list of urls for them
+        """
+        if not self.bulk_update or self.shards:
+            abort(405)
+        data = self._get_request_data()
+        if not isinstance(data, list):
+            return self._response({u'message': _(u'Expected a list')},
+                                  'update_many',
+                                  400)
+        if len(data) > self.max_bulk_size:
+            return self._response({u'message': _(u'Too many items')},
+                                  'update_many',
+                                  400)
+        errors = {}
+        updates = []
+        for (index, item) in enumerate(data):
+            if not isinstance(item, dict) or 'id' not in item:
+                errors[unicode(index)] = {u'id': _(u'Required')}
+                continue
+            item = dict(item)
+            try:
+                values = self._parse_id(item.pop('id'))
+            except HTTPException:
+                errors[unicode(index)] = {u'id': _(u'Not found')}
+                continue
+            try:
+                result = self._deserialize('update', item)
+            except colander.Invalid, e:
+                errors[unicode(index)] = e.asdict()
+                continue
+            updates.append((index, values, result))
+
+        if not errors:
+            existing = self._get_existing_primary_keys(
+                [update[1] for update in updates])
+            for (index, values, result) in updates:
+                if tuple(values) not in existing:
+                    errors[unicode(index)] = {u'id': _(u'Not found')}
+        if errors:
+            return self._response({u'message': _(u'Invalid Data'),
+                                   u'errors': errors},
+                                  'update_many',
+                                  400)
+
+        primary_key = self._get_metadata().primary_key
+        columns = self._get_fromdict_columns()
+        mappings = []
+        for (index, values, result) in updates:
+            mapping = dict((k, v) for (k, v) in result.iteritems()
+                           if k in columns)
+            if not mapping:
+                continue
+            mapping.update(zip([column.key for column in primary_key],
+                               values))
+            mappings.append(mapping)
+        session = self._get_session()
+        try:
+            session.bulk_update_mappings(self.model, mappings)
+            session.commit()
+        except Exception, e:
+            session.rollback()
+            return self._response(e, 'update_many', 500)
+        primary_keys = [update[1] for update in updates]
+        self._invalidate_cache(primary_keys=primary_keys)
+        return self._response({u'count': len(updates),
+                               u'items': [self._primary_key_url(pk)
+                                          for pk in primary_keys]},
+                              'update_many')
+
     def _delete(self, id):
-        """Delete an item"""
+        """Delete an item
+
+        If :attr:`AlchemyView.delete_without_select` is set the item is
+        deleted with one DELETE statement, and a 404 is returned if no row
+        was deleted.
+        """
+        if self.delete_without_select:
+            values = self._parse_id(id)
+            session = self._get_session()
+            try:
+                count = self._delete_primary_keys([values])
+                if not count:
+                    session.rollback()
+                    abort(404)
+                session.commit()
+            except HTTPException:
+                raise
+            except Exception, e:
+                session.rollback()
+                return self._response(e, 'delete', 400)
+            self._invalidate_cache(primary_keys=[values])
+            return self._response({}, 'delete', 200)
         item = self._get_item(id)
         session = self._get_session()
         session.delete(item)
@@ -518,6 +3103,7 @@ class AlchemyView(FlaskView):
             session.commit()
         except Exception, e:
             return self._response(e, 'delete', 400)
+        self._invalidate_cache(item)
         # TODO: What should a delete return?
         return self._response({}, 'delete', 200)
 
@@ -527,13 +3113,109 @@ class AlchemyView(FlaskView):
     This is just an alias for :meth:`AlchemyView._delete`.
     """
 
+    def _get_delete_filter(self, data):
+        """Get the criterion for a filter in :meth:`AlchemyView.delete_many`
+
+        A list value matches any of the values in the list.
+
+        :param data: Dict of name=>value, the names must be in \
+                :attr:`AlchemyView.delete_filter_map`
+
+        :raises: ValueError if the filter is empty or not allowed
+
+        :returns: A criterion
+        """
+        if not isinstance(data, dict) or not data:
+            raise ValueError("The filter must be a non-empty dict")
+        criteria = []
+        for (name, value) in sorted(data.items()):
+            if not self.delete_filter_map or \
+                    name not in self.delete_filter_map:
+                raise ValueError("Invalid filter %r" % name)
+            column = self.delete_filter_map[name]
+            if isinstance(value, list):
+                criteria.append(column.in_(value))
+            else:
+                criteria.append(column == value)
+        return and_(*criteria)
+
+    @route('/', methods=['DELETE'])
+    def delete_many(self):
+        """Handles DELETE to the listing URL
+
+        Returns a 405 unless :attr:`AlchemyView.bulk_delete` is set.
+
+        The data is either a list of ids, ``{"ids": [1, 2]}``, or a filter
+        with names from :attr:`AlchemyView.delete_filter_map`,
+        ``{"filter": {"group": 1}}``. The matching items in
+        :meth:`AlchemyView._base_query` are deleted without being loaded, so
+        ORM cascades and delete events are not run.
+
+        :returns: A response containing the number of deleted items
+        """
+        if not self.bulk_delete or self.shards:
+            abort(405)
+        data = self._get_request_data()
+        if not isinstance(data, dict) or ('ids' in data) == ('filter' in data):
+            return self._response({u'message': _(u'Expected ids or filter')},
+                                  'delete_many',
+                                  400)
+        session = self._get_session()
+        if 'ids' in data:
+            if not isinstance(data['ids'], list):
+                return self._response({u'message': _(u'Expected a list')},
+                                      'delete_many',
+                                      400)
+            if len(data['ids']) > self.max_bulk_size:
+                return self._response({u'message': _(u'Too many items')},
+                                      'delete_many',
+                                      400)
+            primary_keys = []
+            for id in data['ids']:
+                try:
+                    primary_keys.append(self._parse_id(id))
+                except HTTPException:
+                    # Invalid ids can't match any item
+                    pass
+            try:
+                count = self._delete_primary_keys(primary_keys)
+                session.commit()
+            except Exception, e:
+                session.rollback()
+                return self._response(e, 'delete_many', 400)
+        else:
+            try:
+                criterion = self._get_delete_filter(data['filter'])
+            except ValueError:
+                return self._response({u'message': _(u'Invalid filter')},
+                                      'delete_many',
+                                      400)
+            primary_keys = []
+            if self.response_cache is not None:
+                # Cached responses for the deleted items must be invalidated
+                primary_keys = [list(row) for row in
+                                self._base_query().filter(criterion).
+                                with_entities(*[column.attribute for column
+                                                in self._get_metadata().
+                                                primary_key])]
+            try:
+                count = self._write_query(criterion).delete(
+                    synchronize_session=False)
+                session.commit()
+            except Exception, e:
+                session.rollback()
+                return self._response(e, 'delete_many', 400)
+        self._invalidate_cache(primary_keys=primary_keys)
+        return self._response({u'count': count}, 'delete_many')
+
     def index(self):
         """Returns a list
 
         The response look like this::
 
             items: [...]
-            count: Integer
+            count: Integer or None
+            count_type: See :meth:`AlchemyView._count`
             limit: Integer
             offset: Integer
 
@@ -572,21 +3254,316 @@ class AlchemyView(FlaskView):
             return self._response({u'message': _(u'Invalid direction')},
                                   'index',
                                   400)
+        try:
+            fields = self._get_fields()
+        except ValueError:
+            return self._response({u'message': _(u'Invalid fields')},
+                                  'index',
+                                  400)
+        try:
+            filters = self._get_filters()
+        except ValueError:
+            return self._response({u'message': _(u'Invalid filter')},
+                                  'index',
+                                  400)
 
-        query = self._base_query()
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self._index_cache_key(
+                {'limit': limit,
+                 'offset': offset,
+                 'sortby': sortby,
+                 'direction': direction,
+                 'cursor': request.args.get('cursor', None),
+                 'fields': fields,
+                 'filters': filters},
+                self._cache_variant(self._get_response_mimetype(),
+                                    self._get_content_encoding()))
+            response = self._get_cached_response(cache_key)
+            if response is not None:
+                return self._make_conditional(response)
+
+        if self.shards:
+            self._check_shard_options()
+            response = self._sharded_index(limit, offset, sortby, direction,
+                                           fields, filters)
+        else:
+            query = self._apply_eager_load(
+                self._apply_fields(self._apply_filters(self._base_query(),
+                                                       filters),
+                                   fields),
+                fields)
+            if self.cursor_pagination:
+                response = self._cursor_index(query, limit,
+                                              sortby or self.sortby,
+                                              direction, fields)
+            else:
+                response = self._offset_index(query, limit, offset, sortby,
+                                              direction, fields)
+        response = self._add_validators(response)
+        return self._make_conditional(self._cache_response(cache_key,
+                                                           response))
+
+    def _offset_index(self, query, limit, offset, sortby, direction,
+                      fields=None):
+        """Returns a list using limit and offset
+
+        Used by :meth:`AlchemyView.index`, see that method for the response.
+        """
+        streaming = (self.stream_index and
+                     self._get_response_mimetype() == 'application/json')
+        window_count = (not streaming and
+                        self.count_strategy == 'window' and
+                        self._supports_window_count(query))
+        if not window_count:
+            count, count_type = self._count(query)
 
         # Add sortby
         if sortby and self.sortby_map and sortby in self.sortby_map:
             query = query.order_by(getattr(self.sortby_map[sortby],
                                            direction)())
 
+        if window_count:
+            rows = query.add_columns(func.count().over()).\
+                limit(limit).offset(offset).all()
+            items = [row[0] for row in rows]
+            if rows:
+                count = rows[0][1]
+            elif offset:
+                # The page is empty so the count has to be fetched separately
+                count = query.order_by(None).count()
+            else:
+                count = 0
+            count_type = 'exact'
+        elif streaming:
+            return self._stream_json_response(
+                query.limit(limit).offset(offset).yield_per(
+                    self.stream_batch_size),
+                {'count': count,
+                 'count_type': count_type,
+                 'limit': limit,
+                 'offset': offset},
+                fields)
+        else:
+            items = query.limit(limit).offset(offset).all()
+
+        self._check_lazy_loads(items, fields)
+        return self._response({
+            'items': [self._asdict(p, fields) for p in items],
+            'count': count,
+            'count_type': count_type,
+            'limit': limit,
+            'offset': offset},
+            'index')
+
+    def _sharded_index(self, limit, offset, sortby, direction, fields=None,
+                       filters=()):
+        """Returns a list merged from all shards
+
+        Used by :meth:`AlchemyView.index` if :attr:`AlchemyView.shards` is
+        set, the response is the same as for
+        :meth:`AlchemyView._offset_index`. Every shard is queried in its own
+        thread for its first `offset` + `limit` rows, ordered by sortby and
+        the primary key, and the rows are merged in the same order. The count
+        is the sum of the shard counts.
+
+        The databases differ in where they sort NULLs, so each shard orders
+        by whether the value is NULL first. That gives the order Python uses
+        for None.
+        """
+        expressions = []
+        order_by = []
+        if sortby and self.sortby_map and sortby in self.sortby_map:
+            expression = self.sortby_map[sortby]
+            expressions.append(expression)
+            order_by.append(getattr(expression.isnot(None), direction)())
+        expressions.extend(column.attribute
+                           for column in self._get_metadata().primary_key)
+
+        queries = []
+        try:
+            for shard in sorted(self.shards):
+                self._set_shard(shard)
+                queries.append(self._apply_eager_load(
+                    self._apply_fields(self._apply_filters(self._base_query(),
+                                                           filters),
+                                       fields),
+                    fields))
+        finally:
+            self._set_shard(None)
+
+        order_by.extend(getattr(e, direction)() for e in expressions)
+
+        def fetch(query):
+            count = self._count(query)
+            rows = query.order_by(*order_by).add_columns(*expressions).\
+                limit(offset + limit).all()
+            return (count, rows)
+
+        results = self._get_shard_pool().map(fetch, queries)
+
+        (counts, shard_rows) = zip(*results)
+        rows = sorted(itertools.chain(*shard_rows),
+                      key=lambda row: tuple(row[1:]),
+                      reverse=(direction == 'desc'))
+        items = [row[0] for row in rows[offset:offset + limit]]
+
+        # The least precise count type is used for the sum
+        count_types = set(t for (c, t) in counts)
+        count_type = 'exact'
+        for t in ('cached', 'estimated', 'capped', 'none'):
+            if t in count_types:
+                count_type = t
+        count = (sum(c for (c, t) in counts)
+                 if count_type != 'none' else None)
+
+        self._check_lazy_loads(items, fields)
         return self._response({
-            'items': [p.asdict(**(getattr(self,
-                                          'asdict_params',
-                                          self.dict_params or None) or {}))
-                      for p in
-                      query.limit(limit).offset(offset).all()],
-            'count': query.count(),
+            'items': [self._asdict(p, fields) for p in items],
+            'count': count,
+            'count_type': count_type,
             'limit': limit,
             'offset': offset},
             'index')
+
+    def _cursor_index(self, query, limit, sortby, direction, fields=None):
+        """Returns a list using cursor pagination
+
+        Used by :meth:`AlchemyView.index` if
+        :attr:`AlchemyView.cursor_pagination` is set. If the `cursor` argument
+        is set the sortby and direction stored in the cursor will be used.
+
+        The response look like this::
+
+            items: [...]
+            count: Integer or None
+            count_type: See :meth:`AlchemyView._count`
+            limit: Integer
+            next: Cursor or None
+            prev: Cursor or None
+
+        """
+        values = None
+        previous = False
+        cursor = request.args.get('cursor', None)
+        if cursor:
+            try:
+                data = _decode_cursor(cursor)
+                sortby = data['s']
+                direction = data['d']
+                values = list(data['k'])
+                previous = bool(data['p'])
+            except (ValueError, KeyError, TypeError):
+                return self._response({u'message': _(u'Invalid cursor')},
+                                      'index',
+                                      400)
+            if direction not in ('asc', 'desc'):
+                return self._response({u'message': _(u'Invalid cursor')},
+                                      'index',
+                                      400)
+
+        expressions = []
+        if sortby and self.sortby_map and sortby in self.sortby_map:
+            expression = self.sortby_map[sortby]
+            if isinstance(expression, basestring):
+                expression = literal_column(expression)
+            expressions.append(expression)
+        expressions.extend(column.attribute
+                           for column in self._get_metadata().primary_key)
+
+        count, count_type = self._count(query)
+        ascending = (direction == 'asc') != previous
+
+        if values is not None:
+            if len(values) != len(expressions):
+                return self._response({u'message': _(u'Invalid cursor')},
+                                      'index',
+                                      400)
+            try:
+                values = [_coerce_cursor_value(e, v)
+                          for (e, v) in zip(expressions, values)]
+            except (ValueError, TypeError, decimal.InvalidOperation):
+                return self._response({u'message': _(u'Invalid cursor')},
+                                      'index',
+                                      400)
+            query = query.filter(_keyset_criterion(expressions,
+                                                   values,
+                                                   ascending))
+
+        query = query.order_by(*[e.asc() if ascending else e.desc()
+                                 for e in expressions])
+        rows = query.add_columns(*expressions).limit(limit + 1).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if previous:
+            rows.reverse()
+
+        def make_cursor(row, previous):
+            return _encode_cursor({'s': sortby,
+                                   'd': direction,
+                                   'k': list(row[1:]),
+                                   'p': previous})
+
+        next_cursor = prev_cursor = None
+        if rows:
+            if more or previous:
+                next_cursor = make_cursor(rows[-1], False)
+            if (more and previous) or (values is not None and not previous):
+                prev_cursor = make_cursor(rows[0], True)
+
+        self._check_lazy_loads([row[0] for row in rows], fields)
+        return self._response({
+            'items': [self._asdict(row[0], fields) for row in rows],
+            'count': count,
+            'count_type': count_type,
+            'limit': limit,
+            'next': next_cursor,
+            'prev': prev_cursor},
+            'index')
+
+    def _export(self):
+        """Export all items as newline-delimited json
+
+        Streams every item in :meth:`AlchemyView._base_query`, one json object
+        per line, with the mimetype 'application/x-ndjson'. The rows are
+        fetched in batches of :attr:`AlchemyView.export_batch_size` so the
+        memory used is constant. Takes the arguments `sortby` and `direction`
+        like :meth:`AlchemyView.index`, the primary key is always added to
+        the ordering. Filters in :attr:`AlchemyView.filter_map` are applied.
+
+        The export isn't routed by default, add it to a view with::
+
+            export = AlchemyView._export
+
+        It will then be available as GET /<route_base>/export/. A 405 is
+        returned on sharded views.
+        """
+        if self.shards:
+            abort(405)
+        sortby = request.args.get('sortby', None) or self.sortby
+        direction = request.args.get('direction', self.sort_direction)
+        if direction not in ('asc', 'desc'):
+            return self._json_response({u'message': _(u'Invalid direction')},
+                                       400)
+        try:
+            filters = self._get_filters()
+        except ValueError:
+            return self._json_response({u'message': _(u'Invalid filter')},
+                                       400)
+
+        query = self._apply_eager_load(
+            self._apply_filters(self._base_query(), filters))
+        if sortby and self.sortby_map and sortby in self.sortby_map:
+            query = query.order_by(getattr(self.sortby_map[sortby],
+                                           direction)())
+        query = query.order_by(*[getattr(column.attribute, direction)()
+                                 for column
+                                 in self._get_metadata().primary_key])
+
+        def generate():
+            for item in query.yield_per(self.export_batch_size):
+                yield self._json_dumps(self._asdict(item))
+                yield u'\n'
+
+        return Response(stream_with_context(_chunked(generate())),
+                        mimetype='application/x-ndjson')
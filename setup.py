@@ -16,9 +16,10 @@ README = open(os.path.join(here, 'README.rst')).read()
 
 # Requirements for the package
 install_requires = [
-    'SQLAlchemy>=0.8.0',
+    'SQLAlchemy>=1.2',
     'Flask-Classy',
     'colander',
+    'iso8601',
     'dictalchemy',
 ]
 
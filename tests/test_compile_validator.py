@@ -0,0 +1,97 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+from flask_alchemyview import _compile_validator, _remove_colander_null
+import colander as c
+import unittest
+
+
+class Address(c.MappingSchema):
+
+    street = c.SchemaNode(c.String())
+
+    zip = c.SchemaNode(c.String(), missing=c.null)
+
+
+class Tags(c.SequenceSchema):
+
+    tag = c.SchemaNode(c.String(), missing=c.null)
+
+
+class Addresses(c.SequenceSchema):
+
+    address = Address()
+
+
+class Person(c.MappingSchema):
+
+    name = c.SchemaNode(c.String())
+
+    nickname = c.SchemaNode(c.String(), missing=c.null)
+
+    age = c.SchemaNode(c.Int(), missing=c.null)
+
+    address = Address(missing=c.null)
+
+    tags = Tags(missing=c.null)
+
+    addresses = Addresses(missing=c.null)
+
+
+def validated(schema, data):
+    return _remove_colander_null(schema.deserialize(data))
+
+
+DATA = [
+    {'name': u'a'},
+    {'name': u'a', 'nickname': u'', 'age': None},
+    {'name': u'a', 'address': {'street': u's'}},
+    {'name': u'a', 'address': {'street': u's', 'zip': u'1'}},
+    {'name': u'a', 'tags': [u'x', u'', u'y']},
+    {'name': u'a', 'addresses': [{'street': u's'}]},
+]
+
+
+class TestCompileValidator(unittest.TestCase):
+
+    def test_compiled_validator_returns_same_result(self):
+        schema = Person()
+        for data in DATA:
+            assert _compile_validator(schema)(dict(data)) == \
+                validated(schema, dict(data))
+
+    def test_compiled_validator_raises_same_errors(self):
+        schema = Person()
+        with self.assertRaises(c.Invalid) as compiled:
+            _compile_validator(schema)({'address': {}})
+        with self.assertRaises(c.Invalid) as expected:
+            validated(schema, {'address': {}})
+        assert compiled.exception.asdict() == expected.exception.asdict()
+
+    def test_compiled_validator_doesnt_change_schema(self):
+        schema = Person()
+        _compile_validator(schema)
+        assert schema['nickname'].missing is c.null
+
+
+class Raw(c.SchemaType):
+
+    def deserialize(self, node, cstruct):
+        return {'value': cstruct, 'other': c.null}
+
+
+def test_compiled_validator_with_unknown_type():
+    schema = c.SchemaNode(c.Mapping(), c.SchemaNode(Raw(), name='raw'))
+    assert _compile_validator(schema)({'raw': 1}) == {'raw': {'value': 1}}
+
+
+def test_compiled_validator_with_validator_sees_nulls():
+    seen = []
+
+    def validator(node, value):
+        seen.append(dict(value))
+
+    schema = Person(validator=validator)
+    validate = _compile_validator(schema)
+    assert validate({'name': u'a'}) == {'name': u'a'}
+    assert seen[0]['nickname'] is c.null
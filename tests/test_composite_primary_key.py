@@ -0,0 +1,120 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import json
+import unittest
+
+from flask import Flask, url_for
+from flask_alchemyview import AlchemyView
+
+from sqlalchemy import (
+    create_engine,
+    Column,
+    Integer,
+    Unicode,
+)
+from sqlalchemy.orm import sessionmaker, aliased
+from sqlalchemy.ext.declarative import declarative_base
+import colander as c
+from dictalchemy import DictableModel
+
+
+engine = create_engine('sqlite://')
+
+Base = declarative_base(cls=DictableModel)
+
+
+class CompositeModel(Base):
+
+    __tablename__ = 'compositemodel'
+
+    group = Column(Unicode, primary_key=True)
+
+    number = Column(Integer, primary_key=True)
+
+    name = Column(Unicode)
+
+
+class CompositeModelSchema(c.MappingSchema):
+
+    name = c.SchemaNode(c.String())
+
+
+class CompositeModelView(AlchemyView):
+    model = CompositeModel
+    schema = CompositeModelSchema
+
+
+class JoinedCompositeModelView(CompositeModelView):
+    delete_without_select = True
+
+    def _base_query(self):
+        other = aliased(CompositeModel)
+        return self._get_session().query(CompositeModel).join(
+            other,
+            (other.group == CompositeModel.group) &
+            (other.number == CompositeModel.number)).\
+            filter(other.name != u'hidden')
+
+
+class TestCompositePrimaryKey(unittest.TestCase):
+
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        self.session = sessionmaker(bind=engine)()
+        self.app = Flask('test_composite_primary_key')
+        CompositeModelView.register(self.app)
+        CompositeModelView.session = self.session
+        self.session.query(CompositeModel).delete()
+        self.ctx = self.app.test_request_context()
+        self.ctx.push()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def add_model(self):
+        m = CompositeModel(group=u'a', number=2, name=u'name')
+        self.session.add(m)
+        self.session.flush()
+        return m
+
+    def test_metadata_is_compiled_on_register(self):
+        metadata = CompositeModelView._metadata
+        assert [c.key for c in metadata.primary_key] == ['group', 'number']
+        assert metadata.get_route_name == 'CompositeModelView:get'
+
+    def test_item_url(self):
+        m = self.add_model()
+        assert CompositeModelView()._item_url(m) == \
+            url_for('CompositeModelView:get', id=u'a,2')
+
+    def test_get(self):
+        self.add_model()
+        response = self.client.get('/compositemodel/a,2',
+                                   headers=[('Accept', 'application/json')])
+        assert response.status_code == 200
+        assert json.loads(response.data.decode('utf-8')) == {
+            u'group': u'a', u'number': 2, u'name': u'name'}
+
+    def test_get_invalid_id(self):
+        self.add_model()
+        for id in (u'a', u'a,2,3', u'a,b', u'b,2'):
+            response = self.client.get(url_for('CompositeModelView:get',
+                                               id=id),
+                                       headers=[('Accept',
+                                                 'application/json')])
+            assert response.status_code == 404
+
+    def test_delete_with_joined_base_query(self):
+        JoinedCompositeModelView.register(self.app)
+        self.add_model()
+        self.session.add(CompositeModel(group=u'a', number=3,
+                                        name=u'hidden'))
+        self.session.commit()
+        for (id, status) in ((u'a,3', 404), (u'a,2', 200)):
+            response = self.client.delete(
+                url_for('JoinedCompositeModelView:delete', id=id),
+                headers=[('Accept', 'application/json')])
+            assert response.status_code == status
+        assert [m.number for m in self.session.query(CompositeModel)] == [3]
@@ -0,0 +1,51 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import datetime
+
+import iso8601
+
+from flask_alchemyview import (
+    _coerce_cursor_value,
+    _decode_cursor,
+    _encode_cursor,
+)
+from sqlalchemy import Column, Date, DateTime, Time
+
+
+def roundtrip(column, value):
+    data = _decode_cursor(_encode_cursor({'k': [value]}))
+    return _coerce_cursor_value(column, data['k'][0])
+
+
+def test_naive_datetime():
+    value = datetime.datetime(2020, 1, 2, 3, 4, 5, 6)
+    result = roundtrip(Column(DateTime), value)
+    assert result == value
+    assert result.tzinfo is None
+
+
+def test_timezone_aware_datetime():
+    value = iso8601.parse_date(u'2020-01-01T02:00:00.5+02:00')
+    result = roundtrip(Column(DateTime(timezone=True)), value)
+    assert result == value
+    assert result.utcoffset() == datetime.timedelta(hours=2)
+
+
+def test_date():
+    value = datetime.date(2020, 1, 2)
+    assert roundtrip(Column(Date), value) == value
+
+
+def test_time():
+    value = datetime.time(3, 4, 5, 6)
+    assert roundtrip(Column(Time), value) == value
+
+
+def test_invalid_datetime():
+    try:
+        _coerce_cursor_value(Column(DateTime), u'x')
+    except ValueError:
+        pass
+    else:
+        assert False
@@ -0,0 +1,188 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import json
+import logging
+import unittest
+
+from flask import Flask
+from flask_alchemyview import AlchemyView
+
+from sqlalchemy import (
+    create_engine,
+    event,
+    Column,
+    ForeignKey,
+    Integer,
+    Unicode,
+)
+from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.ext.declarative import declarative_base
+import colander as c
+from dictalchemy import DictableModel
+
+
+engine = create_engine('sqlite://')
+
+Base = declarative_base(cls=DictableModel)
+
+
+class Author(Base):
+
+    __tablename__ = 'author'
+
+    id = Column(Integer, primary_key=True)
+
+    name = Column(Unicode)
+
+    books = relationship('Book', backref='author', order_by='Book.id')
+
+
+class Book(Base):
+
+    __tablename__ = 'book'
+
+    id = Column(Integer, primary_key=True)
+
+    author_id = Column(Integer, ForeignKey('author.id'))
+
+    title = Column(Unicode)
+
+
+class AuthorSchema(c.MappingSchema):
+
+    name = c.SchemaNode(c.String())
+
+
+class AuthorView(AlchemyView):
+    model = Author
+    schema = AuthorSchema
+    asdict_params = {'follow': {'books': {'follow': ['author']}}}
+    sparse_fields = ['id', 'name', 'books']
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestEagerLoad(unittest.TestCase):
+
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        self.session = sessionmaker(bind=engine)()
+        self.app = Flask('test_eager_load')
+        AuthorView.register(self.app)
+        AuthorView.session = self.session
+        self.session.query(Book).delete()
+        self.session.query(Author).delete()
+        for i in range(5):
+            self.session.add(Author(name=u'a%d' % i,
+                                    books=[Book(title=u'b%d' % i),
+                                           Book(title=u'c%d' % i)]))
+        self.session.commit()
+        self.ctx = self.app.test_request_context()
+        self.ctx.push()
+        self.client = self.app.test_client()
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self.count_statement)
+
+    def tearDown(self):
+        event.remove(engine, 'before_cursor_execute', self.count_statement)
+        self.session.rollback()
+        self.ctx.pop()
+
+    def count_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def get_index(self, url='/author/'):
+        self.session.expire_all()
+        self.statements = []
+        response = self.client.get(url,
+                                   headers=[('Accept', 'application/json')])
+        assert response.status_code == 200
+        return json.loads(response.data)
+
+    def test_plan_is_derived_from_follow(self):
+        assert AuthorView()._get_eager_load_plan() == [
+            (('books',), 'selectin'),
+            (('books', 'author'), 'selectin')]
+
+    def test_index_eager_loads_followed_relationships(self):
+        data = self.get_index()
+        assert len(data['items']) == 5
+        assert data['items'][0]['books'][0]['author']['name'] == u'a0'
+        # count, authors, books, authors of books
+        assert len(self.statements) == 4
+
+    def test_index_without_eager_load(self):
+        AuthorView.eager_load = {}
+        try:
+            data = self.get_index()
+        finally:
+            del AuthorView.eager_load
+        assert len(data['items']) == 5
+        assert len(self.statements) > 5
+
+    def test_explicit_eager_load(self):
+        AuthorView.eager_load = {'books': 'joined'}
+        try:
+            data = self.get_index()
+        finally:
+            del AuthorView.eager_load
+        assert len(data['items']) == 5
+        assert [b['title'] for b in data['items'][0]['books']] == \
+            [u'b0', u'c0']
+        assert len(self.statements) == 2
+
+    def test_mixed_strategies(self):
+        AuthorView.eager_load = {'books': 'joined',
+                                 'books.author': 'selectin'}
+        try:
+            data = self.get_index()
+        finally:
+            del AuthorView.eager_load
+        assert data['items'][0]['books'][0]['author']['name'] == u'a0'
+        # count, authors joined with books, authors of books
+        assert len(self.statements) == 3
+        assert 'JOIN book' in self.statements[1]
+
+    def test_fields_limits_eager_load(self):
+        data = self.get_index('/author/?fields=name')
+        assert data['items'][0] == {'name': u'a0'}
+        assert not [s for s in self.statements if 'book' in s.lower()]
+
+    def test_fields_with_only_relationships(self):
+        data = self.get_index('/author/?fields=books')
+        assert sorted(data['items'][0].keys()) == ['books', 'id']
+        assert 'author.name' not in self.statements[1]
+
+    def test_lazy_load_warning_in_debug(self):
+        handler = ListHandler()
+        logger = logging.getLogger('flask.ext.alchemyview')
+        logger.addHandler(handler)
+        AuthorView.eager_load = {}
+        self.app.debug = True
+        try:
+            self.get_index()
+        finally:
+            del AuthorView.eager_load
+            logger.removeHandler(handler)
+        assert len(handler.records) == 1
+        assert 'books' in handler.records[0].getMessage()
+
+    def test_no_lazy_load_warning_with_eager_load(self):
+        handler = ListHandler()
+        logger = logging.getLogger('flask.ext.alchemyview')
+        logger.addHandler(handler)
+        self.app.debug = True
+        try:
+            self.get_index()
+        finally:
+            logger.removeHandler(handler)
+        assert not handler.records
@@ -0,0 +1,55 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import json
+import datetime
+import decimal
+import unittest
+
+from flask_alchemyview import (
+    MessagePackEncoder,
+    StdlibJSONBackend,
+    _get_default_encoders,
+    msgpack,
+)
+
+
+needs_msgpack = unittest.skipIf(msgpack is None, 'msgpack is not installed')
+
+
+class Dictable(object):
+
+    def asdict(self):
+        return {u'a': 1}
+
+
+def get_data():
+    return {u'datetime': datetime.datetime(2013, 1, 2, 3, 4, 5, 6),
+            u'date': datetime.date(2013, 1, 2),
+            u'decimal': decimal.Decimal('1.10'),
+            u'dictable': Dictable(),
+            'str': 'value',
+            u'list': [1, u'\xe5', None, True, 1.5]}
+
+
+@needs_msgpack
+def test_message_pack_encodes_the_same_as_json():
+    encoder = MessagePackEncoder()
+    expected = json.loads(StdlibJSONBackend().dumps(get_data()))
+    assert encoder.loads(encoder.dumps(get_data())) == expected
+
+
+@needs_msgpack
+def test_message_pack_loads_strings_as_unicode():
+    encoder = MessagePackEncoder()
+    data = encoder.loads(encoder.dumps({'name': 'a'}))
+    assert data == {u'name': u'a'}
+    assert all(isinstance(k, type(u'')) for k in data)
+
+
+def test_default_encoders():
+    encoders = _get_default_encoders()
+    if msgpack is None:
+        assert encoders == {}
+    else:
+        assert list(encoders) == ['application/x-msgpack']
@@ -0,0 +1,93 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import collections
+import json
+import datetime
+import decimal
+
+from flask_alchemyview import (
+    JSONBackend,
+    StdlibJSONBackend,
+    SimplejsonBackend,
+    OrjsonBackend,
+    _json_default,
+    simplejson,
+    orjson,
+)
+
+
+class Dictable(object):
+
+    def asdict(self):
+        return {u'a': 1}
+
+
+class SubDecimal(decimal.Decimal):
+    pass
+
+
+Point = collections.namedtuple('Point', ['x', 'y'])
+
+
+def get_backends():
+    backends = [StdlibJSONBackend()]
+    if simplejson is not None:
+        backends.append(SimplejsonBackend())
+    if orjson is not None:
+        backends.append(OrjsonBackend())
+    return backends
+
+
+def get_data():
+    return {u'datetime': datetime.datetime(2013, 1, 2, 3, 4, 5, 6),
+            u'date': datetime.date(2013, 1, 2),
+            u'time': datetime.time(3, 4, 5),
+            u'decimal': decimal.Decimal('1.10'),
+            u'subdecimal': SubDecimal('2.5'),
+            u'dictable': Dictable(),
+            u'list': [1, u'\xe5', None, True, 1.5],
+            u'tuple': (1, 2),
+            u'namedtuple': Point(1, 2)}
+
+
+def test_json_default_converts_types():
+    assert _json_default(datetime.date(2013, 1, 2)) == u'2013-01-02'
+    assert _json_default(decimal.Decimal('1.10')) == u'1.10'
+    assert _json_default(SubDecimal('2.5')) == u'2.5'
+    assert _json_default(Dictable()) == {u'a': 1}
+    assert _json_default(Point(1, 2)) == [1, 2]
+
+
+def test_json_default_raises_type_error():
+    try:
+        _json_default(object())
+    except TypeError:
+        pass
+    else:
+        assert False, 'TypeError not raised'
+
+
+def test_json_backends_encode_the_same():
+    expected = {u'datetime': u'2013-01-02T03:04:05.000006',
+                u'date': u'2013-01-02',
+                u'time': u'03:04:05',
+                u'decimal': u'1.10',
+                u'subdecimal': u'2.5',
+                u'dictable': {u'a': 1},
+                u'list': [1, u'\xe5', None, True, 1.5],
+                u'tuple': [1, 2],
+                u'namedtuple': [1, 2]}
+    for backend in get_backends():
+        dumped = backend.dumps(get_data())
+        assert json.loads(dumped) == expected, backend
+        assert backend.loads(dumped) == expected, backend
+
+
+def test_json_backend_is_abstract():
+    try:
+        JSONBackend().dumps({})
+    except NotImplementedError:
+        pass
+    else:
+        assert False, 'NotImplementedError not raised'
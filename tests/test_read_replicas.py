@@ -0,0 +1,141 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, url_for
+from flask_alchemyview import AlchemyView
+
+from sqlalchemy import (
+    create_engine,
+    Column,
+    Integer,
+    Unicode,
+)
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.declarative import declarative_base
+import colander as c
+from dictalchemy import DictableModel
+
+
+Base = declarative_base(cls=DictableModel)
+
+
+class ReplicatedModel(Base):
+
+    __tablename__ = 'replicatedmodel'
+
+    id = Column(Integer, primary_key=True)
+
+    name = Column(Unicode)
+
+
+class ReplicatedModelSchema(c.MappingSchema):
+
+    name = c.SchemaNode(c.String())
+
+
+class ReplicatedModelView(AlchemyView):
+    model = ReplicatedModel
+    schema = ReplicatedModelSchema
+
+
+class TestReadReplicas(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engines = []
+        self.sessions = []
+        # The primary has 1 row, the replicas 3 and 5 rows
+        for (i, name) in enumerate(['primary', 'replica1', 'replica2']):
+            engine = create_engine(
+                'sqlite:///%s' % os.path.join(self.directory, name),
+                poolclass=QueuePool)
+            Base.metadata.create_all(bind=engine)
+            session = sessionmaker(bind=engine)()
+            for j in range(2 * i + 1):
+                session.add(ReplicatedModel(name=u'%s %d' % (name, j)))
+            session.commit()
+            self.engines.append(engine)
+            self.sessions.append(session)
+        self.app = Flask('test_read_replicas')
+        ReplicatedModelView.register(self.app)
+        ReplicatedModelView.session = self.sessions[0]
+        ReplicatedModelView.read_sessions = self.sessions[1:]
+        self.ctx = self.app.test_request_context()
+        self.ctx.push()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.ctx.pop()
+        del ReplicatedModelView.read_sessions
+        for session in self.sessions:
+            session.close()
+        for engine in self.engines:
+            engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def get_count(self):
+        response = self.client.get(url_for('ReplicatedModelView:index'),
+                                   headers=[('Accept', 'application/json')])
+        assert response.status_code == 200
+        # Like a scoped session removed when the request ends
+        for session in self.sessions:
+            session.close()
+        return json.loads(response.data.decode('utf-8'))['count']
+
+    def post(self):
+        return self.client.post(url_for('ReplicatedModelView:post'),
+                                data=json.dumps({'name': u'new'}),
+                                content_type='application/json',
+                                headers=[('Accept', 'application/json')])
+
+    def test_reads_are_round_robin(self):
+        counts = [self.get_count() for i in range(4)]
+        assert sorted(counts) == [3, 3, 5, 5]
+        assert counts[0] != counts[1]
+
+    def test_writes_use_the_primary(self):
+        ReplicatedModelView.read_your_writes_window = 0
+        try:
+            response = self.post()
+            assert response.status_code == 303
+            assert self.sessions[0].query(ReplicatedModel).count() == 2
+            assert 'Set-Cookie' not in response.headers
+            assert self.get_count() in (3, 5)
+        finally:
+            del ReplicatedModelView.read_your_writes_window
+
+    def test_read_your_writes(self):
+        response = self.post()
+        assert response.status_code == 303
+        assert 'alchemyview_last_write' in response.headers['Set-Cookie']
+        # The test client sends the cookie, so reads use the primary
+        assert [self.get_count() for i in range(2)] == [2, 2]
+
+    def test_failed_writes_dont_set_the_cookie(self):
+        response = self.client.post(url_for('ReplicatedModelView:post'),
+                                    data=json.dumps({}),
+                                    content_type='application/json',
+                                    headers=[('Accept', 'application/json')])
+        assert response.status_code == 400
+        assert 'Set-Cookie' not in response.headers
+
+    def test_read_session_is_chosen_once_per_request(self):
+        view = ReplicatedModelView()
+        with self.app.test_request_context():
+            assert view._get_session() is view._get_session()
+
+    def test_least_connections(self):
+        ReplicatedModelView.read_session_strategy = 'least_connections'
+        connection = self.engines[1].connect()
+        try:
+            assert [self.get_count() for i in range(3)] == [5, 5, 5]
+        finally:
+            connection.close()
+            del ReplicatedModelView.read_session_strategy
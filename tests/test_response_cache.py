@@ -0,0 +1,46 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import time
+
+from flask_alchemyview import LRUResponseCache
+
+
+def test_lru_response_cache_get_and_set():
+    cache = LRUResponseCache()
+    assert cache.get('a') is None
+    cache.set('a', (200, 'application/json', '{}'))
+    assert cache.get('a') == (200, 'application/json', '{}')
+
+
+def test_lru_response_cache_delete():
+    cache = LRUResponseCache()
+    cache.set('a', 'value')
+    cache.set('b', 'value')
+    cache.delete('a', 'missing')
+    assert cache.get('a') is None
+    assert cache.get('b') == 'value'
+
+
+def test_lru_response_cache_evicts_least_recently_used():
+    cache = LRUResponseCache(max_bytes=25)
+    cache.set('a', 'x' * 9)
+    cache.set('b', 'x' * 9)
+    cache.get('a')
+    cache.set('c', 'x' * 9)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'x' * 9
+    assert cache.get('c') == 'x' * 9
+
+
+def test_lru_response_cache_doesnt_store_too_large_values():
+    cache = LRUResponseCache(max_bytes=10)
+    cache.set('a', 'x' * 100)
+    assert cache.get('a') is None
+
+
+def test_lru_response_cache_ttl():
+    cache = LRUResponseCache(ttl=0.01)
+    cache.set('a', 'value')
+    time.sleep(0.02)
+    assert cache.get('a') is None
@@ -0,0 +1,132 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import unittest
+
+from flask_alchemyview import _AsdictSerializer
+
+from sqlalchemy import (
+    create_engine,
+    Column,
+    Integer,
+    Unicode,
+    ForeignKey,
+)
+from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.ext.declarative import declarative_base
+from dictalchemy import DictableModel
+
+
+engine = create_engine('sqlite://')
+
+Base = declarative_base(cls=DictableModel)
+
+
+class Parent(Base):
+
+    __tablename__ = 'parent'
+
+    id = Column(Integer, primary_key=True)
+
+    name = Column(Unicode)
+
+    _secret = Column(Unicode)
+
+    children = relationship('Child', backref='parent', order_by='Child.id')
+
+    @property
+    def upper_name(self):
+        return self.name.upper()
+
+
+class Child(Base):
+
+    __tablename__ = 'child'
+
+    id = Column(Integer, primary_key=True)
+
+    name = Column(Unicode)
+
+    parent_id = Column(Integer, ForeignKey('parent.id'))
+
+    def custom(self, **kwargs):
+        return {'custom': self.name}
+
+
+class CustomAsdict(Base):
+
+    __tablename__ = 'customasdict'
+
+    id = Column(Integer, primary_key=True)
+
+    def asdict(self, **kwargs):
+        return {'custom': self.id}
+
+
+class TestAsdictSerializer(unittest.TestCase):
+
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        self.session = sessionmaker(bind=engine)()
+        self.parent = Parent(name=u'parent', _secret=u'secret')
+        self.parent.children = [Child(name=u'a'), Child(name=u'b')]
+        self.orphan = Child(name=u'orphan')
+        self.session.add_all([self.parent, self.orphan])
+        self.session.flush()
+
+    def tearDown(self):
+        self.session.rollback()
+
+    def assert_same_as_asdict(self, item, params):
+        expected = item.asdict(**params)
+        assert _AsdictSerializer(params)(item) == expected
+        return expected
+
+    def test_default(self):
+        data = self.assert_same_as_asdict(self.parent, {})
+        assert '_secret' not in data
+
+    def test_only(self):
+        self.assert_same_as_asdict(self.parent, {'only': ['name']})
+
+    def test_exclude(self):
+        self.assert_same_as_asdict(self.parent, {'exclude': ['name']})
+
+    def test_exclude_pk(self):
+        self.assert_same_as_asdict(self.parent, {'exclude_pk': True})
+
+    def test_exclude_underscore(self):
+        data = self.assert_same_as_asdict(self.parent,
+                                          {'exclude_underscore': False})
+        assert data['_secret'] == u'secret'
+
+    def test_include(self):
+        self.assert_same_as_asdict(self.parent, {'include': ['upper_name']})
+
+    def test_follow_list(self):
+        data = self.assert_same_as_asdict(self.parent,
+                                          {'follow': ['children']})
+        assert len(data['children']) == 2
+
+    def test_follow_with_args(self):
+        self.assert_same_as_asdict(
+            self.parent,
+            {'follow': {'children': {'only': ['name'],
+                                     'follow': {'parent': {
+                                         'exclude': ['id']}}}}})
+
+    def test_follow_method(self):
+        self.assert_same_as_asdict(
+            self.parent, {'follow': {'children': {'method': 'custom'}}})
+
+    def test_follow_parent_key(self):
+        data = self.assert_same_as_asdict(
+            self.parent, {'follow': {'children': {'parent': 'related'}}})
+        assert 'children' in data['related']
+
+    def test_follow_none(self):
+        self.assert_same_as_asdict(self.orphan, {'follow': ['parent']})
+
+    def test_custom_asdict(self):
+        item = CustomAsdict(id=1)
+        assert _AsdictSerializer({})(item) == {'custom': 1}
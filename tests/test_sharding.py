@@ -0,0 +1,222 @@
+# vim: set fileencoding=utf-8 :
+from __future__ import absolute_import, division
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, url_for
+from flask_alchemyview import AlchemyView, ModuloShardResolver
+
+from sqlalchemy import (
+    create_engine,
+    Column,
+    Integer,
+    Unicode,
+)
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.declarative import declarative_base
+import colander as c
+from dictalchemy import DictableModel
+
+
+Base = declarative_base(cls=DictableModel)
+
+
+class ShardedModel(Base):
+
+    __tablename__ = 'shardedmodel'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+
+    name = Column(Unicode)
+
+
+class ShardedModelUpdateSchema(c.MappingSchema):
+
+    name = c.SchemaNode(c.String())
+
+
+class ShardedModelCreateSchema(ShardedModelUpdateSchema):
+
+    id = c.SchemaNode(c.Int())
+
+
+class ShardedModelView(AlchemyView):
+    model = ShardedModel
+    update_schema = ShardedModelUpdateSchema
+    create_schema = ShardedModelCreateSchema
+    shard_resolver = ModuloShardResolver('id')
+    sortby_map = {'name': ShardedModel.name}
+    bulk_delete = True
+    export = AlchemyView._export
+
+
+def name(id):
+    return u'name %d' % ((id * 4) % 9)
+
+
+class TestSharding(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engines = []
+        self.sessions = []
+        for shard in ['a', 'b', 'c']:
+            engine = create_engine(
+                'sqlite:///%s' % os.path.join(self.directory, shard),
+                connect_args={'check_same_thread': False})
+            Base.metadata.create_all(bind=engine)
+            self.engines.append(engine)
+            self.sessions.append(sessionmaker(bind=engine)())
+        # Ids 3, 6, 9 are in shard a, 1, 4, 7 in b and 2, 5, 8 in c
+        for id in range(1, 10):
+            self.sessions[id % 3].add(ShardedModel(id=id, name=name(id)))
+        for session in self.sessions:
+            session.commit()
+        self.app = Flask('test_sharding')
+        ShardedModelView.register(self.app)
+        ShardedModelView.shards = dict(zip(['a', 'b', 'c'], self.sessions))
+        self.ctx = self.app.test_request_context()
+        self.ctx.push()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.ctx.pop()
+        del ShardedModelView.shards
+        for session in self.sessions:
+            session.close()
+        for engine in self.engines:
+            engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def json_request(self, method, url, data=None):
+        response = getattr(self.client, method)(
+            url,
+            data=json.dumps(data) if data is not None else None,
+            content_type='application/json',
+            headers=[('Accept', 'application/json')])
+        # Like a scoped session removed when the request ends
+        for session in self.sessions:
+            session.close()
+        return response
+
+    def get_index(self, **args):
+        response = self.json_request('get',
+                                     url_for('ShardedModelView:index',
+                                             **args))
+        assert response.status_code == 200
+        return json.loads(response.data.decode('utf-8'))
+
+    def test_resolver(self):
+        resolver = ModuloShardResolver('id')
+        assert resolver.shard_for_primary_key({'id': 4}, ['a', 'b']) == 'a'
+        assert resolver.shard_for_data({'id': 5}, ['a', 'b']) == 'b'
+        assert resolver.shard_for_data({'id': u'x'}, ['a', 'b']) in \
+            ('a', 'b')
+        with self.assertRaises(KeyError):
+            resolver.shard_for_data({}, ['a', 'b'])
+
+    def test_get_routes_by_primary_key(self):
+        for id in (3, 4, 8):
+            response = self.json_request(
+                'get', url_for('ShardedModelView:get', id=id))
+            assert response.status_code == 200
+            assert json.loads(response.data.decode('utf-8')) == \
+                {'id': id, 'name': name(id)}
+
+    def test_get_missing(self):
+        response = self.json_request('get',
+                                     url_for('ShardedModelView:get', id=10))
+        assert response.status_code == 404
+
+    def test_post_routes_by_shard_key(self):
+        response = self.json_request('post',
+                                     url_for('ShardedModelView:post'),
+                                     {'id': 10, 'name': u'new'})
+        assert response.status_code == 303
+        assert [s.query(ShardedModel).count() for s in self.sessions] == \
+            [3, 4, 3]
+        assert self.sessions[1].query(ShardedModel).get(10).name == u'new'
+
+    def test_post_invalid(self):
+        response = self.json_request('post',
+                                     url_for('ShardedModelView:post'),
+                                     {'name': u'new'})
+        assert response.status_code == 400
+        assert sum(s.query(ShardedModel).count() for s in self.sessions) == 9
+
+    def test_put_routes_by_primary_key(self):
+        response = self.json_request('put',
+                                     url_for('ShardedModelView:put', id=5),
+                                     {'name': u'changed'})
+        assert response.status_code == 303
+        assert self.sessions[2].query(ShardedModel).get(5).name == u'changed'
+
+    def test_delete_routes_by_primary_key(self):
+        response = self.json_request(
+            'delete', url_for('ShardedModelView:delete', id=6))
+        assert response.status_code == 200
+        assert [s.query(ShardedModel).count() for s in self.sessions] == \
+            [2, 3, 3]
+
+    def test_index_merges_shards(self):
+        data = self.get_index()
+        assert data['count'] == 9
+        assert data['count_type'] == 'exact'
+        assert [item['id'] for item in data['items']] == range(1, 10)
+
+    def test_index_sortby_with_limit_and_offset(self):
+        expected = sorted((name(id) for id in range(1, 10)), reverse=True)
+        for offset in range(0, 10, 3):
+            data = self.get_index(sortby='name', direction='desc', limit=3,
+                                  offset=offset)
+            assert data['count'] == 9
+            assert [item['name'] for item in data['items']] == \
+                expected[offset:offset + 3]
+
+    def test_index_sortby_null_order(self):
+        # One NULL name in every shard
+        for (session, id) in zip(self.sessions, (3, 4, 8)):
+            session.query(ShardedModel).get(id).name = None
+            session.commit()
+        names = [None if id in (3, 4, 8) else name(id) for id in range(1, 10)]
+        for direction in ('asc', 'desc'):
+            expected = sorted(names, reverse=(direction == 'desc'))
+            for offset in range(0, 10, 3):
+                data = self.get_index(sortby='name', direction=direction,
+                                      limit=3, offset=offset)
+                assert [item['name'] for item in data['items']] == \
+                    expected[offset:offset + 3]
+
+    def test_shard_pool_is_reused(self):
+        pool = ShardedModelView._get_shard_pool()
+        self.get_index()
+        assert ShardedModelView._get_shard_pool() is pool
+
+    def test_sortby_name_is_rejected(self):
+        class NameSortbyView(ShardedModelView):
+            sortby_map = {'name': 'name'}
+
+        with self.assertRaisesRegexp(Exception, 'must be a column'):
+            NameSortbyView.register(self.app)
+
+    def test_bulk_delete_is_not_supported(self):
+        response = self.json_request('delete',
+                                     url_for('ShardedModelView:delete_many'),
+                                     {'ids': [1, 2]})
+        assert response.status_code == 405
+
+    def test_export_is_not_supported(self):
+        response = self.json_request('get',
+                                     url_for('ShardedModelView:export'))
+        assert response.status_code == 405
+
+    def test_cursor_pagination_is_rejected(self):
+        class CursorView(ShardedModelView):
+            cursor_pagination = True
+
+        with self.assertRaisesRegexp(Exception, 'Cursor pagination'):
+            CursorView.register(self.app)
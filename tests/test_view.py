@@ -4,21 +4,28 @@ from __future__ import absolute_import, division
 import unittest
 import json
 import datetime
+import zlib
 from flask import (
     Flask,
     url_for,
 )
 
-from flask_alchemyview import AlchemyView
+from flask_alchemyview import (
+    AlchemyView,
+    LRUResponseCache,
+    _count_cache,
+    msgpack,
+)
 
 from sqlalchemy import (
+    event,
     create_engine,
     Column,
     Integer,
     Unicode,
     DateTime,
 )
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, aliased
 from sqlalchemy.ext.declarative import declarative_base
 import colander as c
 from dictalchemy import DictableModel
@@ -54,6 +61,27 @@ class SimpleModelView(AlchemyView):
     schema = SimpleModelSchema
     session = None
     max_page_limit = 20
+    export = AlchemyView._export
+    patch = AlchemyView._patch
+
+
+class JoinedModelView(SimpleModelView):
+    bulk_delete = True
+    delete_filter_map = {'name': SimpleModel.name}
+
+    def _base_query(self):
+        other = aliased(SimpleModel)
+        return self._get_session().query(SimpleModel).\
+            join(other, other.id == SimpleModel.id).filter(other.name != u'a')
+
+
+class BrokenEncoder(object):
+
+    def dumps(self, obj):
+        raise ValueError()
+
+    def loads(self, data):
+        raise ValueError()
 
 
 class TestSimpleModel(unittest.TestCase):
@@ -67,6 +95,7 @@ class TestSimpleModel(unittest.TestCase):
         SimpleModelView.register(self.app)
         SimpleModelView.session = self.session
         self.session.query(SimpleModel).delete()
+        _count_cache.clear()
         self.ctx = self.app.test_request_context()
         self.ctx.push()
         self.client = self.app.test_client()
@@ -170,6 +199,270 @@ class TestSimpleModel(unittest.TestCase):
         assert response.status_code == 400
         assert u'name' in json.loads(response.data.decode('utf-8'))['errors']
 
+    def test_bulk_post(self):
+        SimpleModelView.bulk_create = True
+        try:
+            response = self.json_post(url_for('SimpleModelView:post'),
+                                      [{'name': u'a'}, {'name': u'b'}])
+        finally:
+            del SimpleModelView.bulk_create
+        assert response.status_code == 201
+        assert json.loads(response.data.decode('utf-8')) == {u'count': 2}
+        names = [m.name for m in
+                 self.session.query(SimpleModel).order_by(SimpleModel.id)]
+        assert names == [u'a', u'b']
+
+    def test_bulk_post_reports_errors_by_index(self):
+        SimpleModelView.bulk_create = True
+        try:
+            response = self.json_post(url_for('SimpleModelView:post'),
+                                      [{'name': u'a'}, {}, {'name': u'c'}])
+        finally:
+            del SimpleModelView.bulk_create
+        assert response.status_code == 400
+        errors = json.loads(response.data.decode('utf-8'))['errors']
+        assert list(errors.keys()) == [u'1']
+        assert u'name' in errors[u'1']
+        assert self.session.query(SimpleModel).count() == 0
+
+    def test_bulk_post_max_bulk_size(self):
+        SimpleModelView.bulk_create = True
+        SimpleModelView.max_bulk_size = 1
+        try:
+            response = self.json_post(url_for('SimpleModelView:post'),
+                                      [{'name': u'a'}, {'name': u'b'}])
+        finally:
+            del SimpleModelView.bulk_create
+            del SimpleModelView.max_bulk_size
+        assert response.status_code == 400
+        assert self.session.query(SimpleModel).count() == 0
+
+    def test_bulk_post_is_disabled_by_default(self):
+        response = self.json_post(url_for('SimpleModelView:post'),
+                                  [{'name': u'not created'}])
+        assert response.status_code == 400
+        assert not self.session.query(SimpleModel).filter_by(
+            name=u'not created').count()
+
+    def add_bulk_models(self):
+        models = [SimpleModel(u'a'), SimpleModel(u'b')]
+        self.session.add_all(models)
+        self.session.commit()
+        return [m.id for m in models]
+
+    def test_update_many(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.bulk_update = True
+        try:
+            response = self.json_put(url_for('SimpleModelView:update_many'),
+                                     [{'id': ids[0], 'name': u'c'},
+                                      {'id': ids[1], 'name': u'd'}])
+        finally:
+            del SimpleModelView.bulk_update
+        assert response.status_code == 200
+        data = json.loads(response.data.decode('utf-8'))
+        assert data['count'] == 2
+        assert data['items'] == [url_for('SimpleModelView:get', id=id)
+                                 for id in ids]
+        assert [self.session.query(SimpleModel).get(id).name
+                for id in ids] == [u'c', u'd']
+
+    def test_update_many_with_patch(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.bulk_update = True
+        try:
+            response = self.client.patch(
+                url_for('SimpleModelView:update_many'),
+                data=json.dumps([{'id': ids[0], 'name': u'c'}]),
+                content_type='application/json',
+                headers=[('Accept', 'application/json')])
+        finally:
+            del SimpleModelView.bulk_update
+        assert response.status_code == 200
+        assert self.session.query(SimpleModel).get(ids[0]).name == u'c'
+
+    def test_update_many_reports_errors_by_index(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.bulk_update = True
+        try:
+            response = self.json_put(url_for('SimpleModelView:update_many'),
+                                     [{'id': ids[0], 'name': u'c'},
+                                      {'id': ids[1]},
+                                      {'id': 0, 'name': u'e'},
+                                      {'name': u'f'}])
+        finally:
+            del SimpleModelView.bulk_update
+        assert response.status_code == 400
+        errors = json.loads(response.data.decode('utf-8'))['errors']
+        assert sorted(errors.keys()) == [u'1', u'3']
+        assert u'name' in errors[u'1']
+        assert u'id' in errors[u'3']
+        assert self.session.query(SimpleModel).get(ids[0]).name == u'a'
+
+    def test_update_many_reports_missing_items(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.bulk_update = True
+        try:
+            response = self.json_put(url_for('SimpleModelView:update_many'),
+                                     [{'id': ids[0], 'name': u'c'},
+                                      {'id': 0, 'name': u'e'}])
+        finally:
+            del SimpleModelView.bulk_update
+        assert response.status_code == 400
+        errors = json.loads(response.data.decode('utf-8'))['errors']
+        assert errors == {u'1': {u'id': u'Not found'}}
+        assert self.session.query(SimpleModel).get(ids[0]).name == u'a'
+
+    def test_update_many_is_disabled_by_default(self):
+        response = self.json_put(url_for('SimpleModelView:update_many'), [])
+        assert response.status_code == 405
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_message_pack(self):
+        response = self.client.post(
+            url_for('SimpleModelView:post'),
+            data=msgpack.packb({u'name': u'packed'}, use_bin_type=True),
+            content_type='application/x-msgpack',
+            headers=[('Accept', 'application/x-msgpack')])
+        assert response.status_code == 303
+        response = self.client.get(
+            response.location,
+            headers=[('Accept', 'application/x-msgpack')])
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-msgpack'
+        assert msgpack.unpackb(response.data, raw=False)['name'] == \
+            u'packed'
+
+    def test_invalid_message_pack_data(self):
+        SimpleModelView.encoders = {
+            'application/x-msgpack': BrokenEncoder()}
+        try:
+            response = self.client.post(
+                url_for('SimpleModelView:post'),
+                data=b'invalid',
+                content_type='application/x-msgpack',
+                headers=[('Accept', 'application/json')])
+        finally:
+            del SimpleModelView.encoders
+        assert response.status_code == 400
+
+    def test_browsers_get_html_with_encoders(self):
+        SimpleModelView.encoders = {
+            'application/x-msgpack': BrokenEncoder()}
+        try:
+            with self.app.test_request_context(headers=[(
+                    'Accept', 'text/html,application/xhtml+xml,'
+                    'application/xml;q=0.9,*/*;q=0.8')]):
+                assert SimpleModelView()._get_response_mimetype() == \
+                    'text/html'
+            with self.app.test_request_context(headers=[(
+                    'Accept', 'application/x-msgpack')]):
+                assert SimpleModelView()._get_response_mimetype() == \
+                    'application/x-msgpack'
+            assert 'application/x-msgpack' in \
+                SimpleModelView()._cache_mimetypes()
+        finally:
+            del SimpleModelView.encoders
+
+    def get_compressed_index(self, accept_encoding='gzip'):
+        return self.client.get(url_for('SimpleModelView:index', limit=20),
+                               headers=[('Accept', 'application/json'),
+                                        ('Accept-Encoding', accept_encoding)])
+
+    def test_compress_responses(self):
+        self.add_models(20)
+        SimpleModelView.compress_responses = True
+        SimpleModelView.compress_min_size = 100
+        try:
+            response = self.get_compressed_index()
+            identity = self.get_compressed_index('identity')
+        finally:
+            del SimpleModelView.compress_responses
+            del SimpleModelView.compress_min_size
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        data = zlib.decompress(response.data, 16 + zlib.MAX_WBITS)
+        assert len(response.data) < len(data)
+        assert json.loads(data.decode('utf-8')) == \
+            json.loads(identity.data.decode('utf-8'))
+        assert 'Content-Encoding' not in identity.headers
+
+    def test_compressed_responses_have_their_own_etag(self):
+        m = SimpleModel(u'name')
+        m.created = datetime.datetime(2013, 1, 1, 12, 0, 0)
+        self.session.add(m)
+        self.session.flush()
+        url = url_for('SimpleModelView:get', id=m.id)
+        SimpleModelView.conditional_responses = True
+        SimpleModelView.version_column = 'created'
+        SimpleModelView.compress_responses = True
+        SimpleModelView.compress_min_size = 0
+        try:
+            gzip = self.client.get(url,
+                                   headers=[('Accept', 'application/json'),
+                                            ('Accept-Encoding', 'gzip')])
+            identity = self.client.get(url,
+                                       headers=[('Accept', 'application/json'),
+                                                ('Accept-Encoding',
+                                                 'identity')])
+        finally:
+            del SimpleModelView.conditional_responses
+            del SimpleModelView.version_column
+            del SimpleModelView.compress_responses
+            del SimpleModelView.compress_min_size
+        assert gzip.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Encoding' not in identity.headers
+        assert gzip.headers['ETag'] != identity.headers['ETag']
+
+    def test_compress_min_size(self):
+        self.add_models(1)
+        SimpleModelView.compress_responses = True
+        try:
+            response = self.get_compressed_index()
+        finally:
+            del SimpleModelView.compress_responses
+        assert 'Content-Encoding' not in response.headers
+        assert json.loads(response.data.decode('utf-8'))['count'] == 1
+
+    def test_compressed_responses_are_cached(self):
+        self.add_models(20)
+        SimpleModelView.compress_responses = True
+        SimpleModelView.compress_min_size = 100
+        SimpleModelView.response_cache = LRUResponseCache()
+        try:
+            first = self.get_compressed_index()
+            self.add_models(1)
+            cached = self.get_compressed_index()
+            identity = self.get_compressed_index('identity')
+        finally:
+            del SimpleModelView.compress_responses
+            del SimpleModelView.compress_min_size
+            del SimpleModelView.response_cache
+        assert cached.headers['Content-Encoding'] == 'gzip'
+        assert cached.data == first.data
+        assert 'Content-Encoding' not in identity.headers
+        assert json.loads(identity.data.decode('utf-8'))['count'] == 21
+
+    def test_schema_is_created_once(self):
+        created = []
+
+        class CountingSchema(SimpleModelSchema):
+            def __init__(self, *args, **kwargs):
+                created.append(self)
+                super(CountingSchema, self).__init__(*args, **kwargs)
+
+        SimpleModelView.schema = CountingSchema
+        counts = []
+        try:
+            for name in [u'a', u'b', u'c']:
+                response = self.json_post(url_for('SimpleModelView:post'),
+                                          {'name': name})
+                assert response.status_code == 303
+                counts.append(len(created))
+        finally:
+            SimpleModelView.schema = SimpleModelSchema
+        assert counts[0] == counts[1] == counts[2]
+
     def test_put(self):
         m = SimpleModel(u'name')
         self.session.add(m)
@@ -209,6 +502,197 @@ class TestSimpleModel(unittest.TestCase):
         m = self.session.query(SimpleModel).get(model_id)
         assert not m
 
+    def json_patch(self, url, data):
+        """Patch json data"""
+        return self.client.patch(url,
+                                 data=json.dumps(data),
+                                 content_type='application/json',
+                                 headers=[('Accept', 'application/json')])
+
+    def test_patch(self):
+        ids = self.add_bulk_models()
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        try:
+            response = self.json_patch(url_for('SimpleModelView:patch',
+                                               id=ids[0]),
+                                       {'name': u'c'})
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statement)
+        assert response.status_code == 200
+        assert len(statements) == 1
+        assert statements[0].startswith('UPDATE')
+        assert self.session.query(SimpleModel).get(ids[0]).name == u'c'
+        assert self.session.query(SimpleModel).get(ids[1]).name == u'b'
+
+    def test_patch_non_existing(self):
+        response = self.json_patch(url_for('SimpleModelView:patch', id=0),
+                                   {'name': u'c'})
+        assert response.status_code == 404
+
+    def test_patch_with_invalid_data(self):
+        ids = self.add_bulk_models()
+        response = self.json_patch(url_for('SimpleModelView:patch',
+                                           id=ids[0]),
+                                   {})
+        assert response.status_code == 400
+        assert u'name' in json.loads(response.data.decode('utf-8'))['errors']
+
+    def test_patch_uses_fromdict_params(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.fromdict_params = {'exclude': ['name']}
+        SimpleModelView._metadata = SimpleModelView._compile_metadata()
+        try:
+            response = self.json_patch(url_for('SimpleModelView:patch',
+                                               id=ids[0]),
+                                       {'name': u'c'})
+        finally:
+            del SimpleModelView.fromdict_params
+            SimpleModelView._metadata = SimpleModelView._compile_metadata()
+        assert response.status_code == 400
+        assert self.session.query(SimpleModel).get(ids[0]).name == u'a'
+
+    def test_patch_with_joined_base_query(self):
+        JoinedModelView.register(self.app)
+        ids = self.add_bulk_models()
+        hidden = self.json_patch(url_for('JoinedModelView:patch', id=ids[0]),
+                                 {'name': u'c'})
+        response = self.json_patch(url_for('JoinedModelView:patch',
+                                           id=ids[1]),
+                                   {'name': u'c'})
+        assert hidden.status_code == 404
+        assert response.status_code == 200
+        assert [self.session.query(SimpleModel).get(id).name
+                for id in ids] == [u'a', u'c']
+
+    def test_update_many_uses_fromdict_params(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.bulk_update = True
+        SimpleModelView.fromdict_params = {'exclude': ['name']}
+        SimpleModelView._metadata = SimpleModelView._compile_metadata()
+        try:
+            response = self.json_put(url_for('SimpleModelView:update_many'),
+                                     [{'id': ids[0], 'name': u'c'}])
+        finally:
+            del SimpleModelView.bulk_update
+            del SimpleModelView.fromdict_params
+            SimpleModelView._metadata = SimpleModelView._compile_metadata()
+        assert response.status_code == 200
+        assert self.session.query(SimpleModel).get(ids[0]).name == u'a'
+
+    def test_patch_isnt_routed_by_default(self):
+        class NoPatchView(AlchemyView):
+            model = SimpleModel
+            schema = SimpleModelSchema
+
+        NoPatchView.register(self.app)
+        assert 'NoPatchView:patch' not in self.app.view_functions
+
+    def test_delete_without_select(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.delete_without_select = True
+        try:
+            response = self.json_delete(url_for('SimpleModelView:delete',
+                                                id=ids[0]))
+            assert response.status_code == 200
+            response = self.json_delete(url_for('SimpleModelView:delete',
+                                                id=ids[0]))
+            assert response.status_code == 404
+        finally:
+            del SimpleModelView.delete_without_select
+        assert not self.session.query(SimpleModel).get(ids[0])
+        assert self.session.query(SimpleModel).get(ids[1])
+
+    def test_delete_many_by_ids(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.bulk_delete = True
+        try:
+            response = self.json_delete(url_for('SimpleModelView:delete_many'),
+                                        {'ids': ids + [0, 'x']})
+        finally:
+            del SimpleModelView.bulk_delete
+        assert response.status_code == 200
+        assert json.loads(response.data.decode('utf-8')) == {u'count': 2}
+        assert not self.session.query(SimpleModel).filter(
+            SimpleModel.id.in_(ids)).count()
+
+    def test_delete_many_by_filter(self):
+        ids = self.add_bulk_models()
+        SimpleModelView.bulk_delete = True
+        SimpleModelView.delete_filter_map = {'name': SimpleModel.name}
+        try:
+            response = self.json_delete(url_for('SimpleModelView:delete_many'),
+                                        {'filter': {'name': u'a'}})
+            assert response.status_code == 200
+            assert json.loads(response.data.decode('utf-8')) == {u'count': 1}
+            response = self.json_delete(url_for('SimpleModelView:delete_many'),
+                                        {'filter': {'id': ids[1]}})
+            assert response.status_code == 400
+            response = self.json_delete(url_for('SimpleModelView:delete_many'),
+                                        {'filter': {}})
+            assert response.status_code == 400
+        finally:
+            del SimpleModelView.bulk_delete
+            del SimpleModelView.delete_filter_map
+        assert not self.session.query(SimpleModel).get(ids[0])
+        assert self.session.query(SimpleModel).get(ids[1])
+
+    def test_delete_many_respects_base_query(self):
+        class FilteredDeleteView(SimpleModelView):
+            bulk_delete = True
+
+            def _base_query(self):
+                return self._get_session().query(SimpleModel).filter(
+                    SimpleModel.name != u'a')
+
+        FilteredDeleteView.register(self.app)
+        ids = self.add_bulk_models()
+        response = self.json_delete(url_for('FilteredDeleteView:delete_many'),
+                                    {'ids': ids})
+        assert response.status_code == 200
+        assert json.loads(response.data.decode('utf-8')) == {u'count': 1}
+        assert self.session.query(SimpleModel).get(ids[0])
+
+    def test_delete_with_joined_base_query(self):
+        JoinedModelView.register(self.app)
+        ids = self.add_bulk_models()
+        JoinedModelView.delete_without_select = True
+        try:
+            hidden = self.json_delete(url_for('JoinedModelView:delete',
+                                              id=ids[0]))
+            response = self.json_delete(url_for('JoinedModelView:delete',
+                                                id=ids[1]))
+        finally:
+            del JoinedModelView.delete_without_select
+        assert hidden.status_code == 404
+        assert response.status_code == 200
+        assert self.session.query(SimpleModel).get(ids[0])
+        assert not self.session.query(SimpleModel).get(ids[1])
+
+    def test_delete_many_with_joined_base_query(self):
+        JoinedModelView.register(self.app)
+        ids = self.add_bulk_models()
+        response = self.json_delete(url_for('JoinedModelView:delete_many'),
+                                    {'ids': ids})
+        assert response.status_code == 200
+        assert json.loads(response.data.decode('utf-8')) == {u'count': 1}
+        ids = self.add_bulk_models()
+        response = self.json_delete(url_for('JoinedModelView:delete_many'),
+                                    {'filter': {'name': [u'a', u'b']}})
+        assert response.status_code == 200
+        assert json.loads(response.data.decode('utf-8')) == {u'count': 1}
+        assert [m.name for m in self.session.query(SimpleModel)] == \
+            [u'a', u'a']
+
+    def test_delete_many_is_disabled_by_default(self):
+        response = self.json_delete(url_for('SimpleModelView:delete_many'),
+                                    {'ids': [1]})
+        assert response.status_code == 405
+
     def get_with_limit(self, limit):
         for i in range(100):
             m = SimpleModel(u'name %d' % i)
@@ -292,3 +776,572 @@ class TestSimpleModel(unittest.TestCase):
             content_type='application/json',
         )
         self.assertEqual(response.status_code, 400)
+
+    def get_cursor_pages(self, url_args, direction_key='next'):
+        """Follow cursors and return all items, page by page"""
+        pages = []
+        data = json.loads(self.json_get(url_for('SimpleModelView:index',
+                                                **url_args)).data.
+                          decode('utf-8'))
+        pages.append(data)
+        while data[direction_key]:
+            response = self.json_get(url_for('SimpleModelView:index',
+                                             cursor=data[direction_key],
+                                             limit=url_args.get('limit')))
+            assert response.status_code == 200
+            data = json.loads(response.data.decode('utf-8'))
+            pages.append(data)
+        return pages
+
+    def test_cursor_pagination(self):
+        for i in range(25):
+            self.session.add(SimpleModel(u'name %d' % i))
+        self.session.flush()
+        expected = [m.id for m in
+                    self.session.query(SimpleModel).order_by(SimpleModel.id)]
+        SimpleModelView.cursor_pagination = True
+        try:
+            pages = self.get_cursor_pages({'limit': 10})
+            assert [len(p['items']) for p in pages] == [10, 10, 5]
+            assert [i['id'] for p in pages for i in p['items']] == expected
+            assert pages[0]['prev'] is None
+            assert pages[0]['count'] == 25
+            assert 'offset' not in pages[0]
+            # Walk backwards from the last page
+            response = self.json_get(url_for('SimpleModelView:index',
+                                             cursor=pages[-1]['prev'],
+                                             limit=10))
+            data = json.loads(response.data.decode('utf-8'))
+            assert [i['id'] for i in data['items']] == expected[10:20]
+            assert data['next'] and data['prev']
+        finally:
+            SimpleModelView.cursor_pagination = False
+
+    def test_cursor_pagination_sortby_uses_primary_key_tiebreaker(self):
+        for i in range(15):
+            self.session.add(SimpleModel(u'name %d' % (i % 3)))
+        self.session.flush()
+        expected = [m.id for m in self.session.query(SimpleModel).
+                    order_by(SimpleModel.name.desc(), SimpleModel.id.desc())]
+        SimpleModelView.cursor_pagination = True
+        SimpleModelView.sortby_map = {'name': SimpleModel.name}
+        try:
+            pages = self.get_cursor_pages({'limit': 4,
+                                           'sortby': 'name',
+                                           'direction': 'desc'})
+            assert [i['id'] for p in pages for i in p['items']] == expected
+        finally:
+            SimpleModelView.cursor_pagination = False
+            SimpleModelView.sortby_map = None
+
+    def test_invalid_cursor(self):
+        SimpleModelView.cursor_pagination = True
+        try:
+            response = self.json_get(url_for('SimpleModelView:index',
+                                             cursor='invalid'))
+            assert response.status_code == 400
+        finally:
+            SimpleModelView.cursor_pagination = False
+
+    def get_index_with_count_strategy(self, strategy, **attrs):
+        """Get index data with a count strategy"""
+        SimpleModelView.count_strategy = strategy
+        for (k, v) in attrs.items():
+            setattr(SimpleModelView, k, v)
+        try:
+            response = self.json_get(url_for('SimpleModelView:index'))
+            assert response.status_code == 200
+            return json.loads(response.data.decode('utf-8'))
+        finally:
+            del SimpleModelView.count_strategy
+            for k in attrs:
+                delattr(SimpleModelView, k)
+
+    def add_models(self, count):
+        for i in range(count):
+            self.session.add(SimpleModel(u'name %d' % i))
+        self.session.flush()
+
+    def get_filtered_index(self, **args):
+        SimpleModelView.filter_map = {
+            'name': (SimpleModel.name, ['eq', 'in', 'prefix']),
+            'id': (SimpleModel.id, ['range'])}
+        try:
+            return self.json_get(url_for('SimpleModelView:index', **args))
+        finally:
+            del SimpleModelView.filter_map
+
+    def filtered_names(self, **args):
+        response = self.get_filtered_index(sortby='id', **args)
+        assert response.status_code == 200
+        data = json.loads(response.data.decode('utf-8'))
+        assert data['count'] == len(data['items'])
+        return [item['name'] for item in data['items']]
+
+    def test_filter_eq(self):
+        self.add_models(3)
+        assert self.filtered_names(name=u'name 1') == [u'name 1']
+
+    def test_filter_in(self):
+        self.add_models(3)
+        assert self.filtered_names(name__in=u'name 0,name 2') == \
+            [u'name 0', u'name 2']
+
+    def test_filter_prefix(self):
+        self.add_models(12)
+        self.session.add(SimpleModel(u'name_%'))
+        self.session.flush()
+        assert self.filtered_names(name__prefix=u'name 1') == \
+            [u'name 1', u'name 10', u'name 11']
+        assert self.filtered_names(name__prefix=u'name_') == [u'name_%']
+
+    def test_filter_range(self):
+        self.add_models(5)
+        ids = [m.id for m in
+               self.session.query(SimpleModel).order_by(SimpleModel.id)]
+        assert self.filtered_names(id__range=u'%d,%d' % (ids[1], ids[2])) == \
+            [u'name 1', u'name 2']
+        assert self.filtered_names(id__range=u'%d,' % ids[3]) == \
+            [u'name 3', u'name 4']
+        assert self.filtered_names(id__range=u',%d' % ids[0]) == \
+            [u'name 0']
+
+    def test_invalid_filters(self):
+        self.add_models(1)
+        assert self.get_filtered_index(name__range=u'a,b').status_code == 400
+        assert self.get_filtered_index(id__range=u'x,').status_code == 400
+        assert self.get_filtered_index(id__range=u',').status_code == 400
+
+    def test_filter_with_window_count_and_empty_page(self):
+        self.add_models(4)
+        SimpleModelView.count_strategy = 'window'
+        try:
+            response = self.get_filtered_index(name__in=u'name 0,name 2',
+                                               offset=10)
+        finally:
+            del SimpleModelView.count_strategy
+        data = json.loads(response.data.decode('utf-8'))
+        assert data['items'] == []
+        assert data['count'] == 2
+
+    def test_filters_are_ignored_without_filter_map(self):
+        self.add_models(2)
+        response = self.json_get(url_for('SimpleModelView:index',
+                                         name=u'name 1'))
+        assert json.loads(response.data.decode('utf-8'))['count'] == 2
+
+    def test_count_strategy_exact(self):
+        self.add_models(15)
+        data = self.get_index_with_count_strategy('exact')
+        assert data['count'] == 15
+        assert data['count_type'] == 'exact'
+
+    def test_count_strategy_none(self):
+        self.add_models(15)
+        data = self.get_index_with_count_strategy('none')
+        assert data['count'] is None
+        assert data['count_type'] == 'none'
+        assert len(data['items']) == 10
+
+    def test_count_strategy_capped(self):
+        self.add_models(15)
+        data = self.get_index_with_count_strategy('capped', count_cap=12)
+        assert data['count'] == 12
+        assert data['count_type'] == 'capped'
+        data = self.get_index_with_count_strategy('capped', count_cap=20)
+        assert data['count'] == 15
+        assert data['count_type'] == 'exact'
+
+    def test_count_strategy_cached(self):
+        self.add_models(15)
+        data = self.get_index_with_count_strategy('cached')
+        assert data['count'] == 15
+        assert data['count_type'] == 'exact'
+        self.add_models(1)
+        data = self.get_index_with_count_strategy('cached')
+        assert data['count'] == 15
+        assert data['count_type'] == 'cached'
+
+
+    def test_count_strategy_cached_expires(self):
+        self.add_models(15)
+        data = self.get_index_with_count_strategy('cached', count_cache_ttl=0)
+        assert data['count'] == 15
+        assert data['count_type'] == 'exact'
+        self.add_models(1)
+        data = self.get_index_with_count_strategy('cached', count_cache_ttl=0)
+        assert data['count'] == 16
+        assert data['count_type'] == 'exact'
+
+    def test_count_strategy_estimated_falls_back_to_exact(self):
+        self.add_models(15)
+        data = self.get_index_with_count_strategy('estimated')
+        assert data['count'] == 15
+        assert data['count_type'] == 'exact'
+
+    def test_count_strategy_window(self):
+        self.add_models(15)
+        data = self.get_index_with_count_strategy('window')
+        assert data['count'] == 15
+        assert data['count_type'] == 'exact'
+        assert len(data['items']) == 10
+
+    def test_count_strategy_window_uses_one_statement(self):
+        self.add_models(15)
+        statements = []
+
+        def before_execute(conn, clauseelement, multiparams, params):
+            statements.append(clauseelement)
+
+        event.listen(engine, 'before_execute', before_execute)
+        try:
+            data = self.get_index_with_count_strategy('window')
+        finally:
+            event.remove(engine, 'before_execute', before_execute)
+        assert data['count'] == 15
+        assert len(statements) == 1
+
+    def test_count_strategy_window_empty_page(self):
+        self.add_models(15)
+        SimpleModelView.count_strategy = 'window'
+        try:
+            response = self.json_get(url_for('SimpleModelView:index',
+                                             offset=20))
+            data = json.loads(response.data.decode('utf-8'))
+        finally:
+            del SimpleModelView.count_strategy
+        assert data['items'] == []
+        assert data['count'] == 15
+
+    def test_get_item_statement_is_cached(self):
+        assert SimpleModelView()._can_cache_item_statement()
+        models = [SimpleModel(u'name %d' % i) for i in range(2)]
+        self.session.add_all(models)
+        self.session.flush()
+        for m in models:
+            data = json.loads(self.json_get(url_for('SimpleModelView:get',
+                                                    id=m.id)).data.
+                              decode('utf-8'))
+            assert data['name'] == m.name
+
+    def test_get_item_respects_overridden_base_query(self):
+        class FilteredView(SimpleModelView):
+            def _base_query(self):
+                return self._get_session().query(SimpleModel).filter(
+                    SimpleModel.name != u'hidden')
+
+        FilteredView.register(self.app)
+        assert not FilteredView()._can_cache_item_statement()
+        m = SimpleModel(u'hidden')
+        self.session.add(m)
+        self.session.flush()
+        response = self.json_get(url_for('FilteredView:get', id=m.id))
+        assert response.status_code == 404
+        response = self.json_get(url_for('SimpleModelView:get', id=m.id))
+        assert response.status_code == 200
+        FilteredView.static_base_query = True
+        assert FilteredView()._can_cache_item_statement()
+        response = self.json_get(url_for('FilteredView:get', id=m.id))
+        assert response.status_code == 404
+
+    def test_get_item_from_identity_map(self):
+        m = SimpleModel(u'name')
+        self.session.add(m)
+        self.session.flush()
+        before = SimpleModelView._get_identity_map_stats()
+        statements = []
+
+        def before_execute(conn, clauseelement, multiparams, params):
+            statements.append(clauseelement)
+
+        event.listen(engine, 'before_execute', before_execute)
+        try:
+            assert SimpleModelView()._get_item(m.id) is m
+        finally:
+            event.remove(engine, 'before_execute', before_execute)
+        assert statements == []
+        stats = SimpleModelView._get_identity_map_stats()
+        assert stats['hits'] == before['hits'] + 1
+        assert stats['misses'] == before['misses']
+        assert stats['hit_rate'] > 0
+
+    def test_get_item_identity_map_miss_for_expired_item(self):
+        m = SimpleModel(u'name')
+        self.session.add(m)
+        self.session.flush()
+        model_id = m.id
+        self.session.expire(m)
+        before = SimpleModelView._get_identity_map_stats()
+        assert SimpleModelView()._get_item(model_id) is m
+        stats = SimpleModelView._get_identity_map_stats()
+        assert stats['misses'] == before['misses'] + 1
+
+    def test_get_item_identity_map_lookup_disabled(self):
+        m = SimpleModel(u'name')
+        self.session.add(m)
+        self.session.flush()
+        before = SimpleModelView._get_identity_map_stats()
+        SimpleModelView.identity_map_lookup = False
+        try:
+            assert SimpleModelView()._get_item(m.id) is m
+        finally:
+            del SimpleModelView.identity_map_lookup
+        assert SimpleModelView._get_identity_map_stats() == before
+
+    def test_response_cache_get(self):
+        m = SimpleModel(u'name')
+        self.session.add(m)
+        self.session.flush()
+        model_id = m.id
+        SimpleModelView.response_cache = LRUResponseCache()
+        try:
+            url = url_for('SimpleModelView:get', id=model_id)
+            assert json.loads(self.json_get(url).data.decode('utf-8'))[
+                'name'] == u'name'
+            # Changes without the view are not seen
+            m.name = u'changed'
+            self.session.flush()
+            assert json.loads(self.json_get(url).data.decode('utf-8'))[
+                'name'] == u'name'
+            # A put invalidates the item
+            response = self.json_put(url_for('SimpleModelView:put',
+                                             id=model_id),
+                                     {'name': 'new name'})
+            assert response.status_code == 303
+            assert json.loads(self.json_get(url).data.decode('utf-8'))[
+                'name'] == u'new name'
+        finally:
+            del SimpleModelView.response_cache
+
+    def test_response_cache_index(self):
+        self.add_models(3)
+        SimpleModelView.response_cache = LRUResponseCache()
+        try:
+            url = url_for('SimpleModelView:index')
+            assert json.loads(self.json_get(url).data.decode('utf-8'))[
+                'count'] == 3
+            self.add_models(1)
+            assert json.loads(self.json_get(url).data.decode('utf-8'))[
+                'count'] == 3
+            # Other arguments are cached separately
+            assert json.loads(self.json_get(
+                url_for('SimpleModelView:index', limit=2)).data.
+                decode('utf-8'))['count'] == 4
+            assert json.loads(self.get_filtered_index(
+                name=u'name 2').data.decode('utf-8'))['count'] == 1
+            # A post invalidates all index responses
+            response = self.json_post(url_for('SimpleModelView:post'),
+                                      {'name': 'a name'})
+            assert response.status_code == 303
+            assert json.loads(self.json_get(url).data.decode('utf-8'))[
+                'count'] == 5
+        finally:
+            del SimpleModelView.response_cache
+
+    def test_response_cache_delete(self):
+        m = SimpleModel(u'name')
+        self.session.add(m)
+        self.session.flush()
+        model_id = m.id
+        SimpleModelView.response_cache = LRUResponseCache()
+        try:
+            url = url_for('SimpleModelView:get', id=model_id)
+            assert self.json_get(url).status_code == 200
+            assert self.json_delete(url).status_code == 200
+            assert self.json_get(url).status_code == 404
+        finally:
+            del SimpleModelView.response_cache
+
+    def conditional_get(self, url, headers=()):
+        return self.client.get(url,
+                               headers=[('Accept', 'application/json')] +
+                               list(headers))
+
+    def test_conditional_get_with_body_etag(self):
+        m = SimpleModel(u'name')
+        self.session.add(m)
+        self.session.flush()
+        url = url_for('SimpleModelView:get', id=m.id)
+        SimpleModelView.conditional_responses = True
+        try:
+            response = self.conditional_get(url)
+            etag = response.headers['ETag']
+            assert response.status_code == 200
+            response = self.conditional_get(url, [('If-None-Match', etag)])
+            assert response.status_code == 304
+            assert response.data == b''
+            m.name = u'changed'
+            self.session.flush()
+            response = self.conditional_get(url, [('If-None-Match', etag)])
+            assert response.status_code == 200
+        finally:
+            del SimpleModelView.conditional_responses
+
+    def test_conditional_get_with_version_column_skips_serialization(self):
+        m = SimpleModel(u'name')
+        m.created = datetime.datetime(2013, 1, 1, 12, 0, 0)
+        self.session.add(m)
+        self.session.flush()
+        url = url_for('SimpleModelView:get', id=m.id)
+        SimpleModelView.conditional_responses = True
+        SimpleModelView.version_column = 'created'
+        SimpleModelView.last_modified_column = 'created'
+        try:
+            response = self.conditional_get(url)
+            etag = response.headers['ETag']
+            assert response.headers['Last-Modified'] == \
+                'Tue, 01 Jan 2013 12:00:00 GMT'
+
+            def asdict(self, *args, **kwargs):
+                raise Exception('asdict should not be called')
+
+            SimpleModel.asdict = asdict
+            try:
+                response = self.conditional_get(
+                    url, [('If-None-Match', etag)])
+                assert response.status_code == 304
+                response = self.conditional_get(
+                    url,
+                    [('If-Modified-Since', 'Tue, 01 Jan 2013 12:00:00 GMT')])
+                assert response.status_code == 304
+            finally:
+                del SimpleModel.asdict
+        finally:
+            del SimpleModelView.conditional_responses
+            del SimpleModelView.version_column
+            del SimpleModelView.last_modified_column
+
+    def test_conditional_index_with_response_cache(self):
+        self.add_models(3)
+        url = url_for('SimpleModelView:index')
+        SimpleModelView.conditional_responses = True
+        SimpleModelView.response_cache = LRUResponseCache()
+        try:
+            etag = self.conditional_get(url).headers['ETag']
+            response = self.conditional_get(url, [('If-None-Match', etag)])
+            assert response.status_code == 304
+            assert response.headers['ETag'] == etag
+        finally:
+            del SimpleModelView.conditional_responses
+            del SimpleModelView.response_cache
+
+    def test_stream_index(self):
+        self.add_models(15)
+        url = url_for('SimpleModelView:index', limit=15)
+        expected = json.loads(self.json_get(url).data.decode('utf-8'))
+        SimpleModelView.stream_index = True
+        SimpleModelView.stream_batch_size = 4
+        try:
+            response = self.json_get(url)
+        finally:
+            del SimpleModelView.stream_index
+            del SimpleModelView.stream_batch_size
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        assert json.loads(response.data.decode('utf-8')) == expected
+
+    def test_stream_index_is_not_cached(self):
+        self.add_models(3)
+        url = url_for('SimpleModelView:index')
+        SimpleModelView.stream_index = True
+        SimpleModelView.response_cache = LRUResponseCache()
+        try:
+            assert len(json.loads(self.json_get(url).data.decode('utf-8'))[
+                'items']) == 3
+            self.add_models(1)
+            assert len(json.loads(self.json_get(url).data.decode('utf-8'))[
+                'items']) == 4
+        finally:
+            del SimpleModelView.stream_index
+            del SimpleModelView.response_cache
+
+    def test_export(self):
+        self.add_models(25)
+        expected = [dict(m) for m in
+                    self.session.query(SimpleModel).order_by(SimpleModel.id)]
+        SimpleModelView.export_batch_size = 7
+        try:
+            response = self.client.get(url_for('SimpleModelView:export'))
+        finally:
+            del SimpleModelView.export_batch_size
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = response.data.decode('utf-8').split('\n')
+        assert lines[-1] == ''
+        assert [json.loads(line) for line in lines[:-1]] == expected
+
+    def test_export_sortby(self):
+        self.add_models(5)
+        SimpleModelView.sortby_map = {'name': SimpleModel.name}
+        try:
+            response = self.client.get(url_for('SimpleModelView:export',
+                                               sortby='name',
+                                               direction='desc'))
+        finally:
+            SimpleModelView.sortby_map = None
+        names = [json.loads(line)['name'] for line in
+                 response.data.decode('utf-8').splitlines()]
+        assert names == sorted(names, reverse=True)
+
+    def test_export_isnt_routed_by_default(self):
+        class NoExportView(AlchemyView):
+            model = SimpleModel
+            schema = SimpleModelSchema
+
+        NoExportView.register(self.app)
+        assert 'NoExportView:export' not in self.app.view_functions
+
+    def test_sparse_fields_get(self):
+        m = SimpleModel(u'name')
+        m.created = datetime.datetime.now()
+        self.session.add(m)
+        self.session.flush()
+        model_id = m.id
+        self.session.expunge_all()
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        SimpleModelView.sparse_fields = ['id', 'name']
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.json_get(url_for('SimpleModelView:get',
+                                             id=model_id,
+                                             fields='name'))
+        finally:
+            event.remove(engine, 'before_cursor_execute',
+                         before_cursor_execute)
+            del SimpleModelView.sparse_fields
+        assert json.loads(response.data.decode('utf-8')) == {u'name': u'name'}
+        assert len(statements) == 1
+        assert 'created' not in statements[0]
+
+    def test_sparse_fields_index(self):
+        self.add_models(3)
+        SimpleModelView.sparse_fields = ['id', 'name']
+        try:
+            response = self.json_get(url_for('SimpleModelView:index',
+                                             fields='id,name'))
+        finally:
+            del SimpleModelView.sparse_fields
+        items = json.loads(response.data.decode('utf-8'))['items']
+        assert len(items) == 3
+        assert all(sorted(i.keys()) == [u'id', u'name'] for i in items)
+
+    def test_sparse_fields_invalid_field(self):
+        self.add_models(1)
+        SimpleModelView.sparse_fields = ['id', 'name']
+        try:
+            response = self.json_get(url_for('SimpleModelView:index',
+                                             fields='name,created'))
+        finally:
+            del SimpleModelView.sparse_fields
+        assert response.status_code == 400
+
+    def test_sparse_fields_ignored_if_not_enabled(self):
+        self.add_models(1)
+        response = self.json_get(url_for('SimpleModelView:index',
+                                         fields='name'))
+        item = json.loads(response.data.decode('utf-8'))['items'][0]
+        assert u'created' in item